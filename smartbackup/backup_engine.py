@@ -4,22 +4,46 @@ Implements Full, Incremental, and Differential backup modes.
 """
 
 import os
-import shutil
 import locale
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Callable, List, Generator, Tuple
-from dataclasses import dataclass
+from typing import Optional, Callable, Dict, List, Generator, Set, Tuple
+from dataclasses import dataclass, field
 from enum import Enum
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import threading
+import time
 
-from .hasher import compute_file_hash, compute_quick_hash
-from .database import get_database
+from .hasher import compute_file_hash, compute_sample_hash, copy_and_hash, HASH_ALGORITHM
+from .database import get_database, DatabaseWriter
+from .backup_utils import copy_file, is_rotational_drive
+from .config import get_config
 
 # Day names in Spanish
-DAYS_ES = ["Lunes", "Martes", "Miercoles", "Jueves", "Viernes", "Sabado", "Domingo"]
-MONTHS_ES = ["", "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", 
-             "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+DAYS_ES = ("Lunes", "Martes", "Miercoles", "Jueves", "Viernes", "Sabado", "Domingo")
+MONTHS_ES = ("", "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", 
+             "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre")
+
+# Worker threads hashing and copying files in parallel (hashlib and file I/O release the GIL)
+BACKUP_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+
+# Maximum files queued to the workers at once. Deep enough to keep every worker
+# busy on trees of tiny files, small enough to bound memory on huge trees.
+MAX_PENDING_FILES = 128
+
+# Files processed between database flushes (hash rows + session progress)
+DB_FLUSH_INTERVAL = 10000
+
+# Content-addressed store at the destination root (when deduplication is on).
+# Backed-up files are hardlinks to .objects/<algorithm>/<hash[:2]>/<hash>-<mtime_ns>-<mode>:
+# links share one inode, so only files that also agree on mtime and mode may share it.
+OBJECT_STORE_DIR = ".objects"
+
+# Progress callbacks in per-file loops fire at most every PROGRESS_INTERVAL
+# seconds, plus once every PROGRESS_FILE_INTERVAL files
+PROGRESS_INTERVAL = 0.1
+PROGRESS_FILE_INTERVAL = 256
 
 
 class BackupMode(Enum):
@@ -28,6 +52,14 @@ class BackupMode(Enum):
     DIFFERENTIAL = "differential"
 
 
+# Backup mode names used in backup folder names
+MODE_NAMES_ES = {
+    BackupMode.FULL: "Completo",
+    BackupMode.INCREMENTAL: "Incremental",
+    BackupMode.DIFFERENTIAL: "Diferencial"
+}
+
+
 @dataclass
 class BackupProgress:
     """Progress information for backup operations."""
@@ -74,6 +106,87 @@ class RestoreResult:
     error_message: Optional[str] = None
 
 
+def _ensure_dir(directory: Path, created_dirs: Set[Path]) -> None:
+    """Create a directory (and parents) unless it is already in created_dirs."""
+    if directory not in created_dirs:
+        directory.mkdir(parents=True, exist_ok=True)
+        created_dirs.add(directory)
+
+
+@dataclass
+class FileOutcome:
+    """Result of processing a single file during a backup."""
+    entry: os.DirEntry
+    relative_path: str
+    stat: Optional[os.stat_result] = None
+    inode: int = 0
+    file_hash: Optional[str] = None
+    hash_algo: str = HASH_ALGORITHM
+    sample_hash: Optional[str] = None
+    should_copy: bool = False
+    copied: bool = False
+
+
+class HardlinkTracker:
+    """
+    Tracks paths sharing an inode within one backup, so each inode
+    is hashed and copied once and its other paths become hardlinks.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._first: Dict[Tuple[int, int], Tuple[FileOutcome, threading.Event]] = {}
+    
+    def claim(self, key: Tuple[int, int], outcome: FileOutcome) -> Optional[FileOutcome]:
+        """
+        Register outcome as the first path of an inode, or wait for the first one.
+        
+        Returns:
+            None if outcome is the first path (caller must call release()),
+            otherwise the finished outcome of the first path
+        """
+        with self._lock:
+            first = self._first.get(key)
+            if first is None:
+                self._first[key] = (outcome, threading.Event())
+                return None
+        
+        # The first path was submitted earlier to the same FIFO pool,
+        # so it is already running and waiting can't deadlock
+        first_outcome, done = first
+        done.wait()
+        return first_outcome
+    
+    def release(self, key: Tuple[int, int]) -> None:
+        """Mark the first path of an inode as finished."""
+        with self._lock:
+            _, done = self._first[key]
+        done.set()
+
+
+@dataclass
+class BackupContext:
+    """Per-run state shared by the backup worker threads."""
+    backup_path: Path
+    mode: BackupMode
+    reference_session: Optional[dict]
+    reference_files: dict
+    hash_cache: dict
+    verify_contents: bool
+    spot_check: bool = False
+    # Hash files that are copied anyway while copying them (read once)
+    hash_while_copying: bool = False
+    hardlinks: HardlinkTracker = field(default_factory=HardlinkTracker)
+    # Destination directories known to exist, so each is created only once
+    created_dirs: Set[Path] = field(default_factory=set)
+    # Content-addressed store shared by all backups in the destination, or None
+    object_store: Optional[Path] = None
+    
+    def ensure_dir(self, directory: Path) -> None:
+        """Create a destination directory (and parents) unless already done."""
+        _ensure_dir(directory, self.created_dirs)
+
+
 # Type alias for progress callback
 ProgressCallback = Callable[[BackupProgress], None]
 
@@ -89,51 +202,85 @@ class BackupEngine:
     
     def __init__(self):
         self._db = get_database()
-        self._cancel_requested = False
-        self._lock = threading.Lock()
+        # An Event rather than a locked flag: checked for every file
+        self._cancel_requested = threading.Event()
     
     def cancel(self) -> None:
         """Request cancellation of the current backup."""
-        with self._lock:
-            self._cancel_requested = True
+        self._cancel_requested.set()
     
     def _is_cancelled(self) -> bool:
         """Check if cancellation was requested."""
-        with self._lock:
-            return self._cancel_requested
+        return self._cancel_requested.is_set()
     
     def _reset_cancel(self) -> None:
         """Reset the cancellation flag."""
-        with self._lock:
-            self._cancel_requested = False
+        self._cancel_requested.clear()
+    
+    def _scan_tree(self, source: Path) -> Generator[Tuple[os.DirEntry, str], None, None]:
+        """
+        Recursively yield (entry, relative_path) pairs under source using os.scandir.
+        
+        DirEntry caches its type and stat() results, so walking and
+        inspecting files costs far fewer syscalls than Path.rglob.
+        Relative paths are built from the parent's prefix while descending.
+        Symlinked directories are listed but not descended into.
+        """
+        pending_dirs = [(str(source), "")]
+        while pending_dirs:
+            directory, rel_prefix = pending_dirs.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        relative_path = rel_prefix + entry.name
+                        yield entry, relative_path
+                        if entry.is_dir(follow_symlinks=False):
+                            pending_dirs.append((entry.path, relative_path + os.sep))
+            except (IOError, OSError, PermissionError):
+                # Unreadable directory, skip it
+                continue
     
-    def _get_all_files(self, source: Path) -> Generator[Path, None, None]:
-        """Recursively get all files in source directory."""
-        for item in source.rglob("*"):
-            if item.is_file():
-                yield item
+    def _get_all_files(self, source: Path) -> Generator[Tuple[os.DirEntry, str], None, None]:
+        """Recursively get all files in source directory, with their relative paths."""
+        for entry, relative_path in self._scan_tree(source):
+            try:
+                if entry.is_file():
+                    yield entry, relative_path
+            except OSError:
+                continue
     
-    def _get_all_directories(self, source: Path) -> Generator[Path, None, None]:
-        """Recursively get all directories in source directory."""
-        for item in source.rglob("*"):
-            if item.is_dir():
-                yield item
+    def _get_all_directories(self, source: Path) -> Generator[Tuple[os.DirEntry, str], None, None]:
+        """Recursively get all directories in source directory, with their relative paths."""
+        for entry, relative_path in self._scan_tree(source):
+            try:
+                if entry.is_dir():
+                    yield entry, relative_path
+            except OSError:
+                continue
     
-    def _count_files(self, source: Path) -> int:
-        """Count total files in source directory."""
-        return sum(1 for _ in self._get_all_files(source))
+    def _count_files(self, source: Path, stop: Optional[threading.Event] = None) -> Optional[int]:
+        """
+        Count total files in source directory, for progress totals.
+        
+        os.walk lists each directory's files in one go, so this costs no
+        per-file Python work (special files are counted too, fine for an estimate).
+        
+        Returns:
+            The count, or None if stop was set before it finished
+        """
+        total = 0
+        for _, _, files in os.walk(source):
+            if stop is not None and stop.is_set():
+                return None
+            total += len(files)
+        return total
     
     def _generate_backup_folder_name(self, mode: BackupMode) -> str:
         """Generate backup folder name with format: Type_DayOfWeek_Day_Month."""
         now = datetime.now()
         
         # Mode name
-        mode_names = {
-            BackupMode.FULL: "Completo",
-            BackupMode.INCREMENTAL: "Incremental",
-            BackupMode.DIFFERENTIAL: "Diferencial"
-        }
-        mode_name = mode_names.get(mode, mode.value)
+        mode_name = MODE_NAMES_ES.get(mode, mode.value)
         
         # Day of week (0=Monday)
         day_of_week = DAYS_ES[now.weekday()]
@@ -149,96 +296,305 @@ class BackupEngine:
         
         return f"{mode_name}_{day_of_week}_{day_num}_{month_name}_{time_str}"
     
+    def _worker_count(self, io_mode: str, *paths: Path) -> int:
+        """
+        Number of threads to hash and copy files with.
+        
+        Hard disks lose more to seeking between files than they gain from
+        parallel reads, so they get one worker (files are then read in walk order).
+        """
+        if io_mode == "sequential":
+            return 1
+        if io_mode == "auto" and any(is_rotational_drive(str(path)) for path in paths):
+            from .logger import get_logger
+            get_logger().info("Hard disk detected, processing files sequentially")
+            return 1
+        return BACKUP_WORKERS
+    
+    def _make_progress_updater(
+        self,
+        progress: BackupProgress,
+        progress_callback: Optional[ProgressCallback]
+    ) -> Callable[..., None]:
+        """
+        Build an update_progress(force=False) function that throttles callbacks.
+        
+        UI callbacks are expensive compared to a skipped file, so hot loops
+        report only periodically; pass force=True for start/end/cancel/error.
+        """
+        last_update = 0.0
+        
+        def update_progress(force: bool = False) -> None:
+            nonlocal last_update
+            if not progress_callback:
+                return
+            
+            now = time.monotonic()
+            if (force 
+                    or now - last_update >= PROGRESS_INTERVAL 
+                    or progress.files_processed % PROGRESS_FILE_INTERVAL == 0):
+                last_update = now
+                progress_callback(progress)
+        
+        return update_progress
+    
+    def _cached_hash(self, entry: os.DirEntry, hash_cache: dict) -> Optional[str]:
+        """Get the cached hash of a file if its path, inode, size and mtime are unchanged."""
+        stat = entry.stat()
+        cached = hash_cache.get(entry.path)
+        if cached:
+            cached_inode, cached_size, cached_mtime_ns, cached_hash = cached
+            if (cached_inode == entry.inode() 
+                    and cached_size == stat.st_size 
+                    and cached_mtime_ns == stat.st_mtime_ns):
+                return cached_hash
+        return None
+    
+    def _hash_file(self, entry: os.DirEntry, hash_cache: dict) -> Optional[str]:
+        """
+        Hash a file, reusing the cached hash if its path, inode, size and mtime are unchanged.
+        """
+        cached_hash = self._cached_hash(entry, hash_cache)
+        if cached_hash:
+            return cached_hash
+        
+        return compute_file_hash(Path(entry.path))
+    
     def _should_copy_file(
         self, 
-        source_file: Path, 
+        entry: os.DirEntry, 
         relative_path: str,
         mode: BackupMode,
         reference_session: Optional[dict],
-        reference_files: Optional[dict]
-    ) -> Tuple[bool, Optional[str]]:
+        reference_files: Optional[dict],
+        hash_cache: dict,
+        verify_contents: bool = False,
+        sample_hash: Optional[str] = None,
+        hash_while_copying: bool = False
+    ) -> Tuple[bool, Optional[str], str]:
         """
         Determine if a file should be copied based on backup mode.
         
+        Unchanged size and mtime are trusted as "file unchanged" unless
+        verify_contents is set, in which case every file is hashed, or
+        sample_hash differs from the reference one.
+        
+        With hash_while_copying, files copied regardless of content (or whose
+        sample hash proves a change) are not hashed here: their hash is None
+        unless cached, for the caller to compute during the copy.
+        
         Returns:
-            (should_copy, current_hash) tuple
+            (should_copy, current_hash, hash_algo) tuple
         """
-        # Full backup: always copy, but still need hash
-        if mode == BackupMode.FULL:
-            file_hash = compute_file_hash(source_file)
-            return True, file_hash
-        
-        # For incremental/differential, we need a reference session
-        if not reference_session or not reference_files:
-            # No reference, treat as full backup
-            file_hash = compute_file_hash(source_file)
-            return True, file_hash
-        
-        # Check if file exists in reference
-        if relative_path not in reference_files:
-            # New file -> Copy
-            file_hash = compute_file_hash(source_file)
-            return True, file_hash
+        stat = entry.stat()  # Cached by DirEntry, no extra syscall
         
-        # --- QUICK CHECK (Performance Optimization) ---
-        # Before reading the whole file for SHA-256, check metadata.
-        # If size and mtime differ, we know it changed.
-        # If they match, we assume it's unchanged (standard backup practice).
+        # For incremental/differential, look the file up in the reference session
+        # (one lookup, it may hit the database)
+        reference = None
+        if mode != BackupMode.FULL and reference_session and reference_files:
+            reference = reference_files.get(relative_path)
         
-        ref_hash, ref_size, ref_mtime = reference_files[relative_path]
+        if reference is None:
+            # Full backup, no reference session or new file: always copy, but still need hash
+            if hash_while_copying:
+                return True, self._cached_hash(entry, hash_cache), HASH_ALGORITHM
+            file_hash = self._hash_file(entry, hash_cache)
+            return True, file_hash, HASH_ALGORITHM
         
-        try:
-            stat = source_file.stat()
-            current_size = stat.st_size
-            current_mtime = datetime.fromtimestamp(stat.st_mtime)
-            
-            # Check size first (fastest)
-            if current_size != ref_size:
-                # Size changed -> Content changed -> Copy
-                current_hash = compute_file_hash(source_file)
-                return True, current_hash
-            
-            # Check mtime (with 1s tolerance for FS differences)
-            # Note: ref_mtime comes from DB as datetime or string depending on sqlite adapter
-            if isinstance(ref_mtime, str):
+        ref_hash, ref_size, ref_mtime, ref_algo, ref_sample_hash = reference
+        
+        sample_changed = bool(sample_hash and ref_sample_hash and sample_hash != ref_sample_hash)
+        
+        # --- QUICK CHECK (Performance Optimization) ---
+        # If size and mtime match the reference, assume the file is unchanged
+        # and reuse the reference hash without reading the file.
+        if not verify_contents and stat.st_size == ref_size:
+            if isinstance(ref_mtime, int):
+                # mtime stored in nanoseconds, read from this same filesystem
+                mtime_matches = stat.st_mtime_ns == ref_mtime
+            else:
+                # Sessions from older versions stored an ISO timestamp string
+                mtime_matches = False
                 try:
-                    ref_mtime = datetime.fromisoformat(ref_mtime)
+                    ref_time = datetime.fromisoformat(str(ref_mtime))
+                    current_time = datetime.fromtimestamp(stat.st_mtime)
+                    # 1s tolerance for FS timestamp resolution differences
+                    mtime_matches = abs((current_time - ref_time).total_seconds()) < 1.0
                 except ValueError:
                     pass # Ignore parsing error, fall back to hash check
             
-            if isinstance(ref_mtime, datetime):
-                time_diff = abs((current_mtime - ref_mtime).total_seconds())
-                if time_diff < 1.0:
-                    # Size matches, mtime matches -> Assume unchanged
-                    # Return False (don't copy) and REUSE reference hash (avoid I/O)
-                    return False, ref_hash
-        except Exception:
-            # If metadata check fails, fall back to safe hash comparison
-            pass
-            
-        # --- FALLBACK / CONFIRMATION ---
-        # If we reach here, metadata didn't definitively say "unchanged" 
-        # (or we distrust it), OR it said "changed" but we want to be sure? 
-        # Actually, if size changed, we returned True.
-        # If mtime changed (or parsed wrong), we come here.
-        # So we perform the expensive hash check now.
-        
-        current_hash = compute_file_hash(source_file)
+            # A differing sample means the content changed behind an unchanged mtime
+            if mtime_matches and not sample_changed:
+                # Keep the reference algorithm, old hashes stay valid until the file changes
+                return False, ref_hash, ref_algo
+        
+        # --- HASH CHECK ---
+        if sample_changed and hash_while_copying:
+            # Content certainly changed: hash it while copying instead of reading it twice
+            return True, None, HASH_ALGORITHM
+        
+        # Metadata differs (or verification was requested): compare content.
+        # The hash cache is keyed on the same metadata, so skip it too when the sample differs.
+        current_hash = self._hash_file(entry, {} if sample_changed else hash_cache)
         if current_hash is None:
-            return False, None  # Can't read file, skip
+            return False, None, HASH_ALGORITHM  # Can't read file, skip
+        
+        # Hashes from a different algorithm can't be compared, copy to be safe
+        if ref_algo != HASH_ALGORITHM or current_hash != ref_hash:
+            return True, current_hash, HASH_ALGORITHM  # Content changed
+        
+        return False, current_hash, HASH_ALGORITHM  # Content identical (even if mtime changed)
+    
+    def _process_file(
+        self,
+        entry: os.DirEntry,
+        relative_path: str,
+        ctx: BackupContext
+    ) -> FileOutcome:
+        """
+        Hash a file and copy it into the backup folder if needed.
+        Runs on a worker thread; must not touch progress or the database.
+        """
+        outcome = FileOutcome(entry, relative_path)
+        
+        try:
+            outcome.stat = entry.stat()
+            # DirEntry.stat() leaves st_ino as 0 on Windows; inode() is always valid
+            outcome.inode = entry.inode()
+        except (IOError, OSError, PermissionError):
+            # File vanished or is unreadable, skip it
+            return outcome
+        
+        # Hardlinked file (st_nlink is 0 on Windows, where this is skipped)
+        link_key = None
+        first_link = None
+        if outcome.stat.st_nlink > 1:
+            link_key = (outcome.stat.st_dev, outcome.inode)
+            first_link = ctx.hardlinks.claim(link_key, outcome)
+        
+        try:
+            return self._backup_file(outcome, ctx, first_link)
+        finally:
+            if link_key and first_link is None:
+                ctx.hardlinks.release(link_key)
+    
+    def _backup_file(
+        self,
+        outcome: FileOutcome,
+        ctx: BackupContext,
+        first_link: Optional[FileOutcome] = None
+    ) -> FileOutcome:
+        """
+        Decide whether a stat'ed file needs copying and copy it.
+        
+        first_link is the already processed path sharing this file's inode,
+        whose hash is reused and whose copy is hardlinked instead of copied again.
+        """
+        entry = outcome.entry
+        relative_path = outcome.relative_path
+        backup_path = ctx.backup_path
+        hash_cache = ctx.hash_cache
+        
+        if first_link and first_link.file_hash and first_link.hash_algo == HASH_ALGORITHM:
+            # Same inode means same content: seed the cache so it isn't hashed again
+            hash_cache = {entry.path: (
+                outcome.inode, outcome.stat.st_size, outcome.stat.st_mtime_ns, first_link.file_hash
+            )}
         
-        if current_hash != ref_hash:
-            return True, current_hash  # Content changed
+        if ctx.spot_check:
+            outcome.sample_hash = compute_sample_hash(Path(entry.path))
         
-        return False, current_hash  # Content identical (even if mtime changed)
+        # Linked copies and the object store need the hash before copying
+        hash_while_copying = (
+            ctx.hash_while_copying 
+            and not ctx.object_store 
+            and not (first_link and first_link.copied)
+        )
+        
+        # Determine if file should be copied
+        outcome.should_copy, outcome.file_hash, outcome.hash_algo = self._should_copy_file(
+            entry, 
+            relative_path, 
+            ctx.mode, 
+            ctx.reference_session, 
+            ctx.reference_files,
+            hash_cache,
+            ctx.verify_contents,
+            outcome.sample_hash,
+            hash_while_copying
+        )
+        
+        if outcome.should_copy and (outcome.file_hash or hash_while_copying):
+            # Copy file
+            dest_file = backup_path / relative_path
+            
+            try:
+                ctx.ensure_dir(dest_file.parent)
+                if not outcome.file_hash:
+                    outcome.file_hash = copy_and_hash(entry.path, dest_file)
+                elif first_link and first_link.copied:
+                    try:
+                        os.link(backup_path / first_link.relative_path, dest_file)
+                    except OSError:
+                        # Destination FS without hardlinks (FAT, exFAT...)
+                        copy_file(entry.path, dest_file)
+                elif ctx.object_store:
+                    self._store_deduplicated(entry, outcome, dest_file, ctx)
+                else:
+                    copy_file(entry.path, dest_file)
+                outcome.copied = True
+            except (IOError, OSError, PermissionError):
+                # Log error but continue
+                pass
+        
+        return outcome
     
+    def _store_deduplicated(
+        self,
+        entry: os.DirEntry,
+        outcome: FileOutcome,
+        dest_file: Path,
+        ctx: BackupContext
+    ) -> None:
+        """
+        Back up a file through the content-addressed object store.
+        
+        If an object with the same hash, mtime and mode exists, the file is
+        hardlinked to it and no data is written. Otherwise the file is copied
+        and the copy is registered as the object for later backups.
+        """
+        file_hash = outcome.file_hash
+        stat = outcome.stat
+        # Hardlinks share metadata: key on it too, or a file would be backed up
+        # (and restored) with the timestamp and permissions of another one
+        object_name = f"{file_hash}-{stat.st_mtime_ns}-{stat.st_mode:o}"
+        object_path = ctx.object_store / outcome.hash_algo / file_hash[:2] / object_name
+        
+        try:
+            os.link(object_path, dest_file)
+            return
+        except OSError:
+            pass  # No such object yet (or no hardlink support)
+        
+        copy_file(entry.path, dest_file)
+        
+        # Only register the copy if the source didn't change since it was hashed,
+        # otherwise the object would hold content that doesn't match its name
+        try:
+            current = os.stat(entry.path)
+            if (current.st_size, current.st_mtime_ns) == (outcome.stat.st_size, outcome.stat.st_mtime_ns):
+                ctx.ensure_dir(object_path.parent)
+                os.link(dest_file, object_path)
+        except OSError:
+            pass  # Already registered by another worker, or no hardlink support
     
     def run_backup(
         self,
         source: str,
         destination: str,
         mode: BackupMode,
-        progress_callback: Optional[ProgressCallback] = None
+        progress_callback: Optional[ProgressCallback] = None,
+        io_mode: str = "auto"
     ) -> BackupResult:
         """
         Execute a backup operation.
@@ -248,6 +604,8 @@ class BackupEngine:
             destination: Destination directory path
             mode: Backup mode (full, incremental, differential)
             progress_callback: Optional callback for progress updates
+            io_mode: "parallel", "sequential" (one file at a time, for hard disks)
+                or "auto" to pick sequential when either side is a hard disk
         
         Returns:
             BackupResult with operation details
@@ -266,9 +624,7 @@ class BackupEngine:
         # Initialize progress
         progress = BackupProgress()
         
-        def update_progress():
-            if progress_callback:
-                progress_callback(progress)
+        update_progress = self._make_progress_updater(progress, progress_callback)
         
         # Validate paths
         if not source_path.exists():
@@ -352,131 +708,229 @@ class BackupEngine:
         
         logger.info(f"Session {session_id} created. Mode: {effective_mode.value}. Folder: {backup_folder_name}")
         
+        # Count files in the background so copying starts right away.
+        # Until the count is done, the last session's total is used as an estimate.
+        last_session = self._db.get_last_session(source)
+        if last_session:
+            progress.files_total = last_session.get("files_total") or 0
+        
+        stop_counting = threading.Event()
+        
+        def count_files():
+            total = self._count_files(source_path, stop_counting)
+            if total is not None:
+                progress.files_total = max(total, progress.files_processed)
+        
+        # A single worker means a hard disk: a second walk of the same tree
+        # would make it seek, so stick with the estimate there
+        workers = self._worker_count(io_mode, source_path, dest_path)
+        counter = None
+        if workers > 1:
+            counter = threading.Thread(target=count_files, daemon=True)
+            counter.start()
+        
         try:
-            # Count files
-            progress.files_total = self._count_files(source_path)
-            self._db.update_session_progress(session_id, files_total=progress.files_total)
-            update_progress()
+            update_progress(force=True)
             
             # Re-fetch reference files ONLY if we are still Incremental/Differential
             if effective_mode in (BackupMode.INCREMENTAL, BackupMode.DIFFERENTIAL) and reference_session:
                 logger.info(f"Using reference session {reference_session['id']} for {effective_mode.value} backup")
-                reference_files = self._db.get_session_files(reference_session["id"])
+                reference_files = self._db.get_session_files_lookup(reference_session["id"])
             else:
                 reference_files = {} # Full backup or forced full
             
-            # Copy empty directories for full backup
-            if effective_mode == BackupMode.FULL:
-                for source_dir in self._get_all_directories(source_path):
-                    relative_dir = source_dir.relative_to(source_path)
-                    dest_dir = backup_path / relative_dir
-                    dest_dir.mkdir(parents=True, exist_ok=True)
+            # Hashes from previous runs of files under this source, keyed by path.
+            # When the user asked to always compare contents, don't trust
+            # metadata-keyed caches either.
+            verify_contents = get_config().verify_file_contents
+            cache_prefix = os.path.join(str(source_path), "")
+            ctx = BackupContext(
+                backup_path=backup_path,
+                mode=effective_mode,
+                reference_session=reference_session,
+                reference_files=reference_files,
+                hash_cache={} if verify_contents else self._db.get_hash_cache(HASH_ALGORITHM, cache_prefix),
+                verify_contents=verify_contents,
+                spot_check=get_config().spot_check_files
+            )
+            hash_cache = ctx.hash_cache
+            ctx.created_dirs.add(backup_path)
+            if get_config().deduplicate_files:
+                ctx.object_store = dest_path / OBJECT_STORE_DIR
+            
+            # copy_file can only reflink within one filesystem. Across filesystems,
+            # reading each copied file once for both hash and copy is cheaper.
+            # Also the cache's device key where DirEntry.stat() leaves st_dev 0 (Windows)
+            source_device = 0
+            try:
+                source_device = os.stat(source_path).st_dev
+                ctx.hash_while_copying = source_device != os.stat(backup_path).st_dev
+            except OSError:
+                pass
+            
+            # Cached paths not seen by the end of the run are evicted
+            unseen_cached = set(hash_cache)
             
             # Process files
-            file_hashes_batch: List[Tuple[str, str, int, datetime]] = []
+            file_hashes_batch: List[Tuple[str, str, int, int, str, Optional[str]]] = []
+            hash_cache_batch: List[Tuple[int, int, str, int, int, str]] = []
             
-            for source_file in self._get_all_files(source_path):
-                # Check for cancellation
-                if self._is_cancelled():
-                    progress.is_cancelled = True
-                    self._db.complete_session(session_id, status="cancelled")
-                    update_progress()
-                    logger.info("Backup cancelled by user")
-                    
-                    duration = (datetime.now() - start_time).total_seconds()
-                    return BackupResult(
-                        success=False,
-                        session_id=session_id,
-                        files_total=progress.files_total,
-                        files_copied=progress.files_copied,
-                        files_skipped=progress.files_skipped,
-                        bytes_copied=progress.bytes_copied,
-                        duration_seconds=duration,
-                        error_message="Backup cancelled by user"
-                    )
+            def handle_outcome(outcome: FileOutcome) -> None:
+                """Record a finished file (runs on the calling thread)."""
+                progress.current_file = outcome.relative_path
+                stat = outcome.stat
+                file_hash = outcome.file_hash
                 
-                # Calculate relative path
-                relative_path = str(source_file.relative_to(source_path))
-                progress.current_file = relative_path
-                update_progress()
-                
-                # Determine if file should be copied
-                should_copy, file_hash = self._should_copy_file(
-                    source_file, 
-                    relative_path, 
-                    effective_mode, 
-                    reference_session, 
-                    reference_files
-                )
-                
-                if should_copy and file_hash:
-                    # Copy file
-                    dest_file = backup_path / relative_path
-                    dest_file.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    try:
-                        shutil.copy2(source_file, dest_file)
-                        file_size = source_file.stat().st_size
+                if stat is None:
+                    progress.files_skipped += 1
+                elif outcome.should_copy and file_hash:
+                    if outcome.copied:
                         progress.files_copied += 1
-                        progress.bytes_copied += file_size
+                        progress.bytes_copied += stat.st_size
                         
                         # Store hash for future reference
                         file_hashes_batch.append((
-                            relative_path,
+                            outcome.relative_path,
                             file_hash,
-                            file_size,
-                            datetime.fromtimestamp(source_file.stat().st_mtime)
+                            stat.st_size,
+                            stat.st_mtime_ns,
+                            outcome.hash_algo,
+                            outcome.sample_hash
                         ))
-                        
-                    except (IOError, OSError, PermissionError) as e:
-                        # Log error but continue
-                        pass
                 else:
                     progress.files_skipped += 1
                     
                     # Still store hash for skipped files (they're unchanged)
                     if file_hash:
-                        file_size = source_file.stat().st_size
                         file_hashes_batch.append((
-                            relative_path,
+                            outcome.relative_path,
                             file_hash,
-                            file_size,
-                            datetime.fromtimestamp(source_file.stat().st_mtime)
+                            stat.st_size,
+                            stat.st_mtime_ns,
+                            outcome.hash_algo,
+                            outcome.sample_hash
+                        ))
+                
+                # Remember freshly computed hashes for the next run
+                path = outcome.entry.path
+                unseen_cached.discard(path)
+                if stat is not None and file_hash and outcome.hash_algo == HASH_ALGORITHM:
+                    cache_entry = (outcome.inode, stat.st_size, stat.st_mtime_ns, file_hash)
+                    if hash_cache.get(path) != cache_entry:
+                        hash_cache_batch.append((
+                            stat.st_dev or source_device, outcome.inode, path,
+                            stat.st_size, stat.st_mtime_ns, file_hash
                         ))
                 
                 progress.files_processed += 1
+                if progress.files_total < progress.files_processed:
+                    # Estimate was too low and the count isn't done yet
+                    progress.files_total = progress.files_processed
                 
-                # Update database periodically
-                if progress.files_processed % 100 == 0:
-                    self._db.update_session_progress(
+                # Update database periodically (on the writer thread): hashes and
+                # progress in one transaction, handing over copies as the lists are reused
+                if progress.files_processed % DB_FLUSH_INTERVAL == 0:
+                    writer.put(
+                        self._db.store_backup_progress,
                         session_id,
+                        file_hashes_batch.copy(),
+                        hash_cache_batch.copy(),
+                        HASH_ALGORITHM,
+                        files_total=progress.files_total,
                         files_copied=progress.files_copied,
                         files_skipped=progress.files_skipped,
                         bytes_copied=progress.bytes_copied
                     )
-                    
-                    # Batch insert hashes
-                    if file_hashes_batch:
-                        self._db.store_file_hashes_batch(session_id, file_hashes_batch)
-                        file_hashes_batch.clear()
+                    file_hashes_batch.clear()
+                    hash_cache_batch.clear()
                 
                 update_progress()
             
-            # Final batch insert
-            if file_hashes_batch:
-                self._db.store_file_hashes_batch(session_id, file_hashes_batch)
+            # Hash and copy on a thread pool; results are consumed in submission
+            # order, with at most MAX_PENDING_FILES in flight for backpressure.
+            mirror_dirs = effective_mode == BackupMode.FULL
+            writer = DatabaseWriter()
+            try:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    pending = deque()
+                    
+                    for entry, relative_path in self._scan_tree(source_path):
+                        # Check for cancellation
+                        if self._is_cancelled():
+                            for future in pending:
+                                future.cancel()
+                            break
+                        
+                        try:
+                            if entry.is_dir():
+                                # Full backups mirror the directory tree, empty directories included
+                                if mirror_dirs:
+                                    ctx.ensure_dir(backup_path / relative_path)
+                                continue
+                            if not entry.is_file():
+                                continue
+                        except OSError:
+                            continue
+                        
+                        pending.append(executor.submit(
+                            self._process_file,
+                            entry,
+                            relative_path,
+                            ctx
+                        ))
+                        
+                        if len(pending) >= MAX_PENDING_FILES:
+                            handle_outcome(pending.popleft().result())
+                    
+                    if not self._is_cancelled():
+                        while pending:
+                            handle_outcome(pending.popleft().result())
+            finally:
+                # Flush queued writes; re-raises the first write error
+                writer.close()
+            
+            stop_counting.set()
+            if counter:
+                counter.join()
             
-            # Mark session complete
-            self._db.update_session_progress(
+            if self._is_cancelled():
+                progress.is_cancelled = True
+                self._db.complete_session(session_id, status="cancelled")
+                update_progress(force=True)
+                logger.info("Backup cancelled by user")
+                
+                duration = (datetime.now() - start_time).total_seconds()
+                return BackupResult(
+                    success=False,
+                    session_id=session_id,
+                    files_total=progress.files_total,
+                    files_copied=progress.files_copied,
+                    files_skipped=progress.files_skipped,
+                    bytes_copied=progress.bytes_copied,
+                    duration_seconds=duration,
+                    error_message="Backup cancelled by user"
+                )
+            
+            # Every file has been seen, so the processed count is the exact total
+            progress.files_total = progress.files_processed
+            
+            # Final batch insert, then mark session complete
+            self._db.store_backup_progress(
                 session_id,
+                file_hashes_batch,
+                hash_cache_batch,
+                HASH_ALGORITHM,
+                files_total=progress.files_total,
                 files_copied=progress.files_copied,
                 files_skipped=progress.files_skipped,
                 bytes_copied=progress.bytes_copied
             )
             self._db.complete_session(session_id, status="completed")
+            if unseen_cached:
+                self._db.evict_hash_cache(list(unseen_cached))
             
             progress.is_complete = True
-            update_progress()
+            update_progress(force=True)
             
             duration = (datetime.now() - start_time).total_seconds()
             return BackupResult(
@@ -492,11 +946,12 @@ class BackupEngine:
             
         except Exception as e:
             # Handle unexpected errors
+            stop_counting.set()
             error_msg = str(e)
             self._db.complete_session(session_id, status="error", error_message=error_msg)
             
             progress.error = error_msg
-            update_progress()
+            update_progress(force=True)
             
             duration = (datetime.now() - start_time).total_seconds()
             return BackupResult(
@@ -524,7 +979,8 @@ class BackupEngine:
         self,
         backup_folder: str,
         destination: str,
-        progress_callback: Optional[ProgressCallback] = None
+        progress_callback: Optional[ProgressCallback] = None,
+        io_mode: str = "auto"
     ) -> RestoreResult:
         """
         Restore files from a backup folder to a destination.
@@ -546,9 +1002,7 @@ class BackupEngine:
         # Initialize progress
         progress = BackupProgress()
         
-        def update_progress():
-            if progress_callback:
-                progress_callback(progress)
+        update_progress = self._make_progress_updater(progress, progress_callback)
         
         # Validate backup folder
         if not backup_path.exists():
@@ -569,7 +1023,7 @@ class BackupEngine:
                 # 2. Get File Manifest
                 files_to_restore = self._db.get_session_files(session['id'])
                 progress.files_total = len(files_to_restore)
-                update_progress()
+                update_progress(force=True)
                 
                 # 3. Build Backup Chain (for finding file content)
                 source_path = session['source_path']
@@ -585,7 +1039,12 @@ class BackupEngine:
                 
                 # Chain: [Current, Prev1, Prev2, ... Full]
                 # Note: 'session' dict includes backup_folder name/path info
-                chain = [session] + history
+                # Older sessions than the last full backup can't hold needed content
+                chain = []
+                for sess in [session] + history:
+                    chain.append(sess)
+                    if sess.get('mode') == BackupMode.FULL.value:
+                        break
                 logger.info(f"Backup chain length: {len(chain)}")
                 
                 # Pre-calculate backup roots for the chain
@@ -594,61 +1053,30 @@ class BackupEngine:
                 # i.e., root_backup_dir = backup_path.parent
                 root_backup_dir = backup_path.parent
                 
-                files_restored = 0
-                files_skipped = 0
-                bytes_restored = 0
+                chain_roots = [
+                    root_backup_dir / sess['backup_folder']
+                    for sess in chain if sess.get('backup_folder')
+                ]
                 
-                for rel_path, (f_hash, f_size, f_mtime) in files_to_restore.items():
-                    if self._is_cancelled():
+                # List chain folders once (newest first wins) instead of probing
+                # every folder for every file; stop once the manifest is covered
+                owners: Dict[str, Path] = {}
+                for root in chain_roots:
+                    if len(owners) >= len(files_to_restore):
                         break
-                        
-                    progress.current_file = rel_path
-                    update_progress()
-                    
-                    found = False
-                    dest_file = dest_path / rel_path
-                    
-                    # Search logic:
-                    # 1. Check current session folder (most likely)
-                    # 2. Check previous sessions in order
-                    
-                    for sess in chain:
-                        sess_folder_name = sess.get('backup_folder')
-                        if not sess_folder_name:
-                             # Fallback: try to guess or skip
-                             # If we can't find the folder name, we can't find the file.
-                             continue
-                             
-                        candidate_source = root_backup_dir / sess_folder_name / rel_path
-                        
-                        if candidate_source.exists():
-                            # Found it!
-                            try:
-                                dest_file.parent.mkdir(parents=True, exist_ok=True)
-                                shutil.copy2(candidate_source, dest_file)
-                                files_restored += 1
-                                bytes_restored += candidate_source.stat().st_size
-                                found = True
-                            except (IOError, OSError, PermissionError) as e:
-                                logger.warning(f"Failed to copy {candidate_source}: {e}")
-                                files_skipped += 1
-                                found = True # Found but failed to copy
-                            break
-                    
-                    if not found:
-                        # File is in manifest but content missing from all chain folders.
-                        # This implies corruption or missing backup folder.
-                        msg = f"Error: Content for {rel_path} not found in backup chain."
-                        print(msg)
-                        logger.error(msg)
-                        files_skipped += 1
-                    
-                    progress.files_processed += 1
-                    progress.files_copied = files_restored
-                    progress.files_skipped = files_skipped
-                    progress.bytes_copied = bytes_restored
-                    update_progress()
-                    
+                    for _, rel_path in self._get_all_files(root):
+                        if rel_path in files_to_restore:
+                            owners.setdefault(rel_path, root)
+                
+                workers = self._worker_count(io_mode, backup_path, dest_path)
+                self._restore_files(
+                    files_to_restore, chain_roots, dest_path, progress, update_progress, workers, owners
+                )
+                files_restored = progress.files_copied
+                files_skipped = progress.files_skipped
+                bytes_restored = progress.bytes_copied
+                
+                update_progress(force=True)
                 duration = (datetime.now() - start_time).total_seconds()
                 
                 if self._is_cancelled():
@@ -662,7 +1090,8 @@ class BackupEngine:
                 # --- LEGACY RESTORE (Fallback) ---
                 # No DB session found (old backup). Copy exactly what's in the folder.
                 logger.info("No session found in DB. Falling back to Legacy Restore.")
-                return self._legacy_restore(backup_path, dest_path, progress, update_progress, start_time)
+                workers = self._worker_count(io_mode, backup_path, dest_path)
+                return self._legacy_restore(backup_path, dest_path, progress, update_progress, start_time, workers)
             
         except Exception as e:
             import traceback
@@ -671,49 +1100,131 @@ class BackupEngine:
             duration = (datetime.now() - start_time).total_seconds()
             return RestoreResult(False, progress.files_total, 0, 0, 0, duration, str(e))
 
-    def _legacy_restore(self, backup_path, dest_path, progress, update_callback, start_time):
+    def _restore_file(
+        self,
+        rel_path: str,
+        chain_roots: List[Path],
+        dest_path: Path,
+        created_dirs: Set[Path]
+    ) -> Tuple[bool, Optional[int]]:
+        """
+        Copy rel_path from the first backup folder in chain_roots that has it.
+        Runs on a worker thread; must not touch progress.
+        
+        Returns:
+            (found, bytes_copied) tuple, bytes_copied is None if the copy failed
+        """
+        from .logger import get_logger
+        
+        dest_file = dest_path / rel_path
+        for root in chain_roots:
+            candidate_source = root / rel_path
+            try:
+                file_size = candidate_source.stat().st_size
+            except OSError:
+                continue  # Not in this backup folder
+            
+            try:
+                _ensure_dir(dest_file.parent, created_dirs)
+                copy_file(candidate_source, dest_file)
+                return True, file_size
+            except (IOError, OSError, PermissionError) as e:
+                get_logger().warning(f"Failed to copy {candidate_source}: {e}")
+                return True, None  # Found but failed to copy
+        
+        return False, None
+    
+    def _restore_files(
+        self,
+        rel_paths,
+        chain_roots: List[Path],
+        dest_path: Path,
+        progress: BackupProgress,
+        update_progress: Callable[..., None],
+        workers: int = BACKUP_WORKERS,
+        owners: Optional[Dict[str, Path]] = None
+    ) -> None:
+        """
+        Restore files on a thread pool, updating progress as they finish.
+        Stops early (leaving progress partial) if the restore is cancelled.
+        
+        owners optionally maps relative paths to the chain folder holding them;
+        other files are searched for in every folder of chain_roots.
+        """
+        from .logger import get_logger
+        logger = get_logger()
+        
+        def handle_result(rel_path: str, found: bool, file_size: Optional[int]) -> None:
+            progress.current_file = rel_path
+            if not found:
+                # File is in manifest but content missing from all chain folders.
+                # This implies corruption or missing backup folder.
+                msg = f"Error: Content for {rel_path} not found in backup chain."
+                print(msg)
+                logger.error(msg)
+                progress.files_skipped += 1
+            elif file_size is None:
+                progress.files_skipped += 1
+            else:
+                progress.files_copied += 1
+                progress.bytes_copied += file_size
+            
+            progress.files_processed += 1
+            update_progress()
+        
+        # Destination directories known to exist, so each is created only once
+        created_dirs: Set[Path] = {dest_path}
+        
+        # Same bounded, in-order pipeline as run_backup
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            
+            for rel_path in rel_paths:
+                if self._is_cancelled():
+                    for _, future in pending:
+                        future.cancel()
+                    return
+                
+                owner = owners.get(rel_path) if owners else None
+                roots = [owner] if owner else chain_roots
+                pending.append((rel_path, executor.submit(self._restore_file, rel_path, roots, dest_path, created_dirs)))
+                
+                if len(pending) >= MAX_PENDING_FILES:
+                    rel_path, future = pending.popleft()
+                    handle_result(rel_path, *future.result())
+            
+            while pending and not self._is_cancelled():
+                rel_path, future = pending.popleft()
+                handle_result(rel_path, *future.result())
+            
+            for _, future in pending:
+                future.cancel()
+    
+    def _legacy_restore(self, backup_path, dest_path, progress, update_callback, start_time, workers=BACKUP_WORKERS):
         """Legacy restore logic: simple copy of folder contents."""
         try:
             progress.files_total = self._count_files(backup_path)
-            update_callback()
-            
-            files_restored = 0
-            files_skipped = 0
-            bytes_restored = 0
+            update_callback(force=True)
             
             # Copy all directories
-            for source_dir in self._get_all_directories(backup_path):
-                relative_dir = source_dir.relative_to(backup_path)
+            for _, relative_dir in self._get_all_directories(backup_path):
                 dest_dir = dest_path / relative_dir
                 dest_dir.mkdir(parents=True, exist_ok=True)
             
             # Copy all files
-            for backup_file in self._get_all_files(backup_path):
-                if self._is_cancelled():
-                     duration = (datetime.now() - start_time).total_seconds()
-                     return RestoreResult(False, progress.files_total, files_restored, files_skipped, bytes_restored, duration, "Restore cancelled by user")
-                
-                relative_path = backup_file.relative_to(backup_path)
-                dest_file = dest_path / relative_path
-                
-                progress.current_file = str(relative_path)
-                update_callback()
-                
-                try:
-                    dest_file.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(backup_file, dest_file)
-                    file_size = backup_file.stat().st_size
-                    files_restored += 1
-                    bytes_restored += file_size
-                except (IOError, OSError, PermissionError):
-                    files_skipped += 1
-                
-                progress.files_processed += 1
-                progress.files_copied = files_restored
-                progress.files_skipped = files_skipped
-                progress.bytes_copied = bytes_restored
-                update_callback()
+            self._restore_files(
+                (relative_path for _, relative_path in self._get_all_files(backup_path)),
+                [backup_path], dest_path, progress, update_callback, workers
+            )
+            files_restored = progress.files_copied
+            files_skipped = progress.files_skipped
+            bytes_restored = progress.bytes_copied
+            
+            if self._is_cancelled():
+                duration = (datetime.now() - start_time).total_seconds()
+                return RestoreResult(False, progress.files_total, files_restored, files_skipped, bytes_restored, duration, "Restore cancelled by user")
             
+            update_callback(force=True)
             duration = (datetime.now() - start_time).total_seconds()
             return RestoreResult(True, progress.files_total, files_restored, files_skipped, bytes_restored, duration)
             
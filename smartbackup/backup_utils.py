@@ -1,21 +1,23 @@
 """
-Backup utilities for compression and encryption.
+Backup utilities for file copying, compression and encryption.
 """
 
 import os
+import sys
+import threading
 import zipfile
 import shutil
-import tempfile
-from pathlib import Path
-from typing import Optional, Callable
-from datetime import datetime
-import hashlib
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Union, BinaryIO
 import base64
 
 # Encryption imports
 try:
     from cryptography.fernet import Fernet
     from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
     from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
     CRYPTO_AVAILABLE = True
 except ImportError:
@@ -27,6 +29,184 @@ def is_crypto_available() -> bool:
     return CRYPTO_AVAILABLE
 
 
+# Bytes requested per copy_file_range call
+COPY_CHUNK_SIZE = 1024 * 1024 * 1024
+
+
+def _fadvise(fd: int, advice_name: str) -> None:
+    """Pass an access-pattern hint to the kernel where supported; never fails."""
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, getattr(os, advice_name))
+        except OSError:
+            pass
+
+
+def _copy_file_range(source: str, dest: str) -> None:
+    """Copy file data inside the kernel with copy_file_range (Linux only)."""
+    with open(source, 'rb') as fsrc, open(dest, 'wb') as fdst:
+        src_fd = fsrc.fileno()
+        dst_fd = fdst.fileno()
+        size = os.fstat(src_fd).st_size
+        copied = 0
+        
+        # Larger read-ahead while copying
+        _fadvise(src_fd, "POSIX_FADV_SEQUENTIAL")
+        
+        while True:
+            sent = os.copy_file_range(src_fd, dst_fd, COPY_CHUNK_SIZE)
+            if sent == 0:
+                break
+            copied += sent
+        
+        # Some filesystems (procfs, FUSE) report success without copying anything
+        if copied == 0 and size > 0:
+            raise OSError("copy_file_range copied no data")
+        
+        # The source is read once per backup: don't let it push useful pages out of the cache
+        _fadvise(src_fd, "POSIX_FADV_DONTNEED")
+
+
+def copy_file(source: str, dest: str) -> None:
+    """
+    Copy a file and its metadata, like shutil.copy2.
+    
+    On Linux, data is copied with copy_file_range so it never passes through
+    Python (and is reflinked on Btrfs/XFS). Otherwise, or if that fails,
+    falls back to shutil.copy2, which uses sendfile/fcopyfile where available.
+    
+    Raises:
+        OSError: If the file cannot be copied
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            _copy_file_range(source, dest)
+            shutil.copystat(source, dest)
+            return
+        except OSError:
+            pass  # Unsupported here (cross-device, old kernel...), use the portable path
+    
+    shutil.copy2(source, dest)
+
+
+def _is_rotational_windows(path: str) -> Optional[bool]:
+    """Ask the volume holding path whether it incurs a seek penalty."""
+    import ctypes
+    from ctypes import wintypes
+    
+    class STORAGE_PROPERTY_QUERY(ctypes.Structure):
+        _fields_ = [
+            ("PropertyId", wintypes.DWORD),
+            ("QueryType", wintypes.DWORD),
+            ("AdditionalParameters", ctypes.c_ubyte * 1),
+        ]
+    
+    class DEVICE_SEEK_PENALTY_DESCRIPTOR(ctypes.Structure):
+        _fields_ = [
+            ("Version", wintypes.DWORD),
+            ("Size", wintypes.DWORD),
+            ("IncursSeekPenalty", wintypes.BOOLEAN),
+        ]
+    
+    StorageDeviceSeekPenaltyProperty = 7
+    PropertyStandardQuery = 0
+    IOCTL_STORAGE_QUERY_PROPERTY = 0x002D1400
+    FILE_SHARE_READ_WRITE = 0x1 | 0x2
+    OPEN_EXISTING = 3
+    INVALID_HANDLE_VALUE = wintypes.HANDLE(-1).value
+    
+    drive = os.path.splitdrive(os.path.abspath(path))[0]
+    if not drive or drive.startswith("\\\\"):
+        return None  # Network share or no drive letter
+    
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.CreateFileW.restype = wintypes.HANDLE
+    handle = kernel32.CreateFileW(
+        f"\\\\.\\{drive}", 0, FILE_SHARE_READ_WRITE, None, OPEN_EXISTING, 0, None
+    )
+    if handle == INVALID_HANDLE_VALUE:
+        return None
+    
+    try:
+        query = STORAGE_PROPERTY_QUERY(StorageDeviceSeekPenaltyProperty, PropertyStandardQuery)
+        result = DEVICE_SEEK_PENALTY_DESCRIPTOR()
+        returned = wintypes.DWORD()
+        ok = kernel32.DeviceIoControl(
+            wintypes.HANDLE(handle), IOCTL_STORAGE_QUERY_PROPERTY,
+            ctypes.byref(query), ctypes.sizeof(query),
+            ctypes.byref(result), ctypes.sizeof(result),
+            ctypes.byref(returned), None
+        )
+        if not ok:
+            return None
+        return bool(result.IncursSeekPenalty)
+    finally:
+        kernel32.CloseHandle(wintypes.HANDLE(handle))
+
+
+def _is_rotational_linux(path: str) -> Optional[bool]:
+    """Read the rotational flag of the block device holding path from sysfs."""
+    st_dev = os.stat(path).st_dev
+    device = os.path.realpath(f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}")
+    
+    # Partitions have no queue/ of their own, it lives on the parent disk
+    for directory in (device, os.path.dirname(device)):
+        try:
+            with open(os.path.join(directory, "queue", "rotational")) as f:
+                return f.read().strip() == "1"
+        except OSError:
+            continue
+    
+    return None  # Not a block device (tmpfs, network, device-mapper without queue...)
+
+
+def is_rotational_drive(path: str) -> Optional[bool]:
+    """
+    Detect whether path lives on a spinning hard disk.
+    
+    Args:
+        path: Any existing path on the drive to check
+    
+    Returns:
+        True for rotational media, False for SSDs, None if unknown
+    """
+    try:
+        if sys.platform == "win32":
+            return _is_rotational_windows(path)
+        if sys.platform.startswith("linux"):
+            return _is_rotational_linux(path)
+    except Exception:
+        pass
+    
+    return None
+
+
+def prune_object_store(store: str) -> int:
+    """
+    Delete objects no backup links to anymore from a content-addressed store.
+    
+    Each object is a hardlink shared with the backed-up files, so an object
+    whose link count dropped to 1 is only referenced by the store itself.
+    
+    Args:
+        store: Path to the object store directory
+    
+    Returns:
+        Number of objects removed
+    """
+    removed = 0
+    for root, _dirs, files in os.walk(store):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if os.stat(path).st_nlink <= 1:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
+
+
 def derive_key_from_password(password: str, salt: bytes = None) -> tuple:
     """
     Derive a Fernet key from a password using PBKDF2.
@@ -51,9 +231,114 @@ def derive_key_from_password(password: str, salt: bytes = None) -> tuple:
     return key, salt
 
 
+# Encrypted file layout: ENCRYPTION_MAGIC, salt, GCM nonce, ciphertext, GCM tag.
+# Files without the magic are whole-file Fernet tokens (salt + token) from older versions.
+ENCRYPTION_MAGIC = b"SBENC2\0\0"
+SALT_SIZE = 16
+NONCE_SIZE = 12
+TAG_SIZE = 16
+
+# Plaintext bytes processed per read while encrypting/decrypting (1MB)
+CRYPT_CHUNK_SIZE = 1024 * 1024
+
+
+# Already-compressed formats, stored as-is in ZIPs: deflating them costs
+# CPU time for no size gain
+STORED_EXTENSIONS = frozenset({
+    ".zip", ".7z", ".rar", ".gz", ".tgz", ".bz2", ".xz", ".zst",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".mp3", ".m4a", ".aac", ".ogg", ".opus", ".flac",
+    ".mp4", ".m4v", ".mkv", ".avi", ".mov", ".webm",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp", ".epub", ".jar", ".apk",
+})
+
+# Deflate level for ZIP members that are compressed: level 3 is much faster
+# than the default 6 for a few percent larger output
+ZIP_DEFLATE_LEVEL = 3
+
+# Bytes copied per read into a ZIP member; zf.write() would use 8KB (1MB)
+ZIP_COPY_CHUNK_SIZE = 1024 * 1024
+
+# Threads extracting ZIP members in parallel (same sizing as BACKUP_WORKERS)
+EXTRACT_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+
+# Other files are stored too if their first 4KB barely deflates (>95% of size)
+COMPRESSIBILITY_SAMPLE_SIZE = 4096
+INCOMPRESSIBLE_RATIO = 0.95
+
+
+def _is_incompressible(f: BinaryIO) -> bool:
+    """Quick deflate of the start of an open file; rewinds it afterwards."""
+    sample = f.read(COMPRESSIBILITY_SAMPLE_SIZE)
+    f.seek(0)
+    if len(sample) < COMPRESSIBILITY_SAMPLE_SIZE:
+        return False  # Small files: just deflate them
+    return len(zlib.compress(sample, 1)) > INCOMPRESSIBLE_RATIO * len(sample)
+
+
+class _EncryptingWriter:
+    """
+    Write-only file object that AES-GCM encrypts everything written to it
+    into an open output file. close() writes the authentication tag.
+    """
+    
+    def __init__(self, output: BinaryIO, password: str):
+        # Fresh salt per file; the key is derived for this file only and never
+        # cached with the password
+        key, salt = derive_key_from_password(password, os.urandom(SALT_SIZE))
+        nonce = os.urandom(NONCE_SIZE)
+        self._output = output
+        self._encryptor = Cipher(
+            algorithms.AES(base64.urlsafe_b64decode(key)), modes.GCM(nonce)
+        ).encryptor()
+        output.write(ENCRYPTION_MAGIC + salt + nonce)
+    
+    def write(self, data) -> int:
+        self._output.write(self._encryptor.update(data))
+        return len(data)
+    
+    def flush(self) -> None:
+        self._output.flush()
+    
+    def close(self) -> None:
+        self._output.write(self._encryptor.finalize())
+        self._output.write(self._encryptor.tag)
+
+
+def _walk_for_zip(root: str):
+    """
+    Yield (path, arcname, is_dir) for every file under root, plus empty
+    directories (which would otherwise be lost), using os.scandir.
+    Symlinked directories are listed but not descended into.
+    """
+    pending_dirs = [(root, "")]
+    while pending_dirs:
+        directory, rel_prefix = pending_dirs.pop()
+        has_entries = False
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    has_entries = True
+                    arcname = rel_prefix + entry.name
+                    try:
+                        if entry.is_dir():
+                            if entry.is_symlink():
+                                yield entry.path, arcname, True
+                            else:
+                                pending_dirs.append((entry.path, arcname + os.sep))
+                        elif entry.is_file():
+                            yield entry.path, arcname, False
+                    except OSError:
+                        continue
+        except OSError:
+            continue  # Unreadable directory, skip it
+        if not has_entries and rel_prefix:
+            yield directory, rel_prefix[:-1], True
+
+
 def compress_folder(
     source_folder: str,
-    output_path: str,
+    output_path: Union[str, BinaryIO],
     progress_callback: Optional[Callable[[int, int], None]] = None
 ) -> bool:
     """
@@ -61,29 +346,39 @@ def compress_folder(
     
     Args:
         source_folder: Path to folder to compress
-        output_path: Output ZIP file path
+        output_path: Output ZIP file path, or a writable file object
+            (need not be seekable)
         progress_callback: Optional callback(current, total)
     
     Returns:
         True if successful
     """
     try:
-        source = Path(source_folder)
-        
-        # Count files for progress
-        all_files = list(source.rglob("*"))
-        total = len(all_files)
+        # Count entries for progress (only if someone is listening)
+        total = 0
+        if progress_callback:
+            total = sum(1 for _ in _walk_for_zip(str(source_folder)))
         current = 0
         
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
-            for item in all_files:
-                if item.is_file():
-                    arcname = item.relative_to(source)
-                    zf.write(item, arcname)
-                elif item.is_dir():
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_DEFLATE_LEVEL) as zf:
+            for path, arcname, is_dir in _walk_for_zip(str(source_folder)):
+                if not is_dir:
+                    # zf.write() copies in 8 KiB chunks; stream 1 MiB at a time instead
+                    zinfo = zipfile.ZipInfo.from_file(path, arcname)
+                    with open(path, 'rb') as src:
+                        if (os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS
+                                or _is_incompressible(src)):
+                            zinfo.compress_type = zipfile.ZIP_STORED
+                        else:
+                            zinfo.compress_type = zipfile.ZIP_DEFLATED
+                            # open() ignores the ZipFile level for a given ZipInfo
+                            # (public as compress_level from Python 3.13)
+                            zinfo._compresslevel = ZIP_DEFLATE_LEVEL
+                        with zf.open(zinfo, 'w') as dst:
+                            shutil.copyfileobj(src, dst, ZIP_COPY_CHUNK_SIZE)
+                else:
                     # Add empty directories
-                    arcname = str(item.relative_to(source)) + "/"
-                    zf.writestr(arcname, "")
+                    zf.writestr(arcname + "/", "")
                 
                 current += 1
                 if progress_callback:
@@ -95,6 +390,53 @@ def compress_folder(
         return False
 
 
+def _extract_members(
+    zip_path: str,
+    members: list,
+    output_folder: str,
+    workers: int,
+    progress_callback: Optional[Callable[[int, int], None]]
+) -> None:
+    """
+    Extract members on a thread pool (inflate releases the GIL). Each worker
+    thread reads through its own ZipFile handle; progress is reported from
+    the calling thread, in member order.
+    """
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+    
+    def extract(member: str) -> None:
+        zf = getattr(local, "zf", None)
+        if zf is None:
+            zf = local.zf = zipfile.ZipFile(zip_path, 'r')
+            with handles_lock:
+                handles.append(zf)
+        try:
+            zf.extract(member, output_folder)
+        except FileExistsError:
+            # Another worker created the same parent directory first
+            zf.extract(member, output_folder)
+    
+    total = len(members)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for i, member in enumerate(members):
+                pending.append(executor.submit(extract, member))
+                if len(pending) >= workers * 4:
+                    pending.popleft().result()
+                    if progress_callback:
+                        progress_callback(i + 1 - len(pending), total)
+            while pending:
+                pending.popleft().result()
+                if progress_callback:
+                    progress_callback(total - len(pending), total)
+    finally:
+        for zf in handles:
+            zf.close()
+
+
 def decompress_folder(
     zip_path: str,
     output_folder: str,
@@ -103,6 +445,9 @@ def decompress_folder(
     """
     Decompress a ZIP file to a folder.
     
+    Members are extracted in parallel unless the archive or the output
+    folder is on a spinning disk, where seeking between them would be slower.
+    
     Args:
         zip_path: Path to ZIP file
         output_folder: Output folder path
@@ -116,6 +461,11 @@ def decompress_folder(
             members = zf.namelist()
             total = len(members)
             
+            os.makedirs(output_folder, exist_ok=True)
+            if total > 1 and not (is_rotational_drive(zip_path) or is_rotational_drive(output_folder)):
+                _extract_members(zip_path, members, output_folder, EXTRACT_WORKERS, progress_callback)
+                return True
+            
             for i, member in enumerate(members):
                 zf.extract(member, output_folder)
                 if progress_callback:
@@ -133,7 +483,7 @@ def encrypt_file(
     password: str
 ) -> bool:
     """
-    Encrypt a file using AES (Fernet).
+    Encrypt a file using AES-256-GCM, streaming it in chunks.
     
     Args:
         input_path: Input file path
@@ -147,18 +497,10 @@ def encrypt_file(
         return False
     
     try:
-        key, salt = derive_key_from_password(password)
-        fernet = Fernet(key)
-        
-        with open(input_path, 'rb') as f:
-            data = f.read()
-        
-        encrypted = fernet.encrypt(data)
-        
-        # Write salt + encrypted data
-        with open(output_path, 'wb') as f:
-            f.write(salt)  # 16 bytes
-            f.write(encrypted)
+        with open(input_path, 'rb') as fin, open(output_path, 'wb') as fout:
+            writer = _EncryptingWriter(fout, password)
+            shutil.copyfileobj(fin, writer, CRYPT_CHUNK_SIZE)
+            writer.close()
         
         return True
     except Exception as e:
@@ -172,7 +514,7 @@ def decrypt_file(
     password: str
 ) -> bool:
     """
-    Decrypt a file using AES (Fernet).
+    Decrypt a file written by encrypt_file (or by older, Fernet-based versions).
     
     Args:
         input_path: Input encrypted file path
@@ -187,6 +529,10 @@ def decrypt_file(
     
     try:
         with open(input_path, 'rb') as f:
+            if f.read(len(ENCRYPTION_MAGIC)) == ENCRYPTION_MAGIC:
+                return _decrypt_stream(f, output_path, password)
+            
+            f.seek(0)
             salt = f.read(16)
             encrypted = f.read()
         
@@ -204,6 +550,48 @@ def decrypt_file(
         return False
 
 
+def _decrypt_stream(f: BinaryIO, output_path: str, password: str) -> bool:
+    """Decrypt an AES-GCM file positioned after its magic; removes the output if invalid."""
+    salt = f.read(SALT_SIZE)
+    nonce = f.read(NONCE_SIZE)
+    start = f.tell()
+    end = os.fstat(f.fileno()).st_size - TAG_SIZE
+    if len(salt) != SALT_SIZE or len(nonce) != NONCE_SIZE or end < start:
+        print("Decryption error: truncated file")
+        return False
+    
+    f.seek(end)
+    tag = f.read(TAG_SIZE)
+    f.seek(start)
+    
+    key, _ = derive_key_from_password(password, salt)
+    decryptor = Cipher(
+        algorithms.AES(base64.urlsafe_b64decode(key)), modes.GCM(nonce, tag)
+    ).decryptor()
+    
+    try:
+        with open(output_path, 'wb') as out:
+            remaining = end - start
+            while remaining:
+                chunk = f.read(min(CRYPT_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise ValueError("truncated file")
+                remaining -= len(chunk)
+                out.write(decryptor.update(chunk))
+            # Verifies the tag: wrong password or tampered data
+            out.write(decryptor.finalize())
+        return True
+    except Exception as e:
+        # Wrong password, tampered data, or an I/O error partway through: never
+        # leave partially decrypted, unauthenticated plaintext behind
+        print(f"Decryption error: {str(e) or 'authentication failed'}")
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
+        return False
+
+
 def compress_and_encrypt_backup(
     source_folder: str,
     output_path: str,
@@ -224,63 +612,41 @@ def compress_and_encrypt_backup(
     Returns:
         True if successful
     """
+    enc_path = None
     try:
-        if compress:
-            zip_path = output_path + ".zip"
-            
-            def zip_progress(cur, tot):
-                if progress_callback:
-                    progress_callback("compressing", cur, tot)
-            
-            if not compress_folder(source_folder, zip_path, zip_progress):
-                return False
-            
-            if password:
-                enc_path = output_path + ".zip.enc"
-                
-                if progress_callback:
-                    progress_callback("encrypting", 0, 1)
-                
-                if not encrypt_file(zip_path, enc_path, password):
-                    return False
-                
-                # Remove unencrypted zip
-                os.remove(zip_path)
-                
-                if progress_callback:
-                    progress_callback("encrypting", 1, 1)
-            
+        if not compress and not password:
             return True
         
-        elif password:
-            # Encrypt without compression - create temp zip first
-            temp_zip = output_path + "_temp.zip"
-            
-            def zip_progress(cur, tot):
-                if progress_callback:
-                    progress_callback("compressing", cur, tot)
-            
-            if not compress_folder(source_folder, temp_zip, zip_progress):
-                return False
-            
-            enc_path = output_path + ".enc"
-            
-            if progress_callback:
-                progress_callback("encrypting", 0, 1)
-            
-            if not encrypt_file(temp_zip, enc_path, password):
-                os.remove(temp_zip)
-                return False
-            
-            os.remove(temp_zip)
-            
-            if progress_callback:
-                progress_callback("encrypting", 1, 1)
-            
-            return True
+        def on_zip_progress(cur, tot):
+            progress_callback("compressing", cur, tot)
         
-        return True
+        # Without a listener, don't make compress_folder count the tree first
+        zip_progress = on_zip_progress if progress_callback else None
+        
+        if not password:
+            return compress_folder(source_folder, output_path + ".zip", zip_progress)
+        
+        if not CRYPTO_AVAILABLE:
+            return False
+        
+        # The ZIP is encrypted as it is written, no unencrypted temp file
+        enc_path = output_path + (".zip.enc" if compress else ".enc")
+        with open(enc_path, 'wb') as f:
+            writer = _EncryptingWriter(f, password)
+            ok = compress_folder(source_folder, writer, zip_progress)
+            if ok:
+                writer.close()
+        
+        if not ok:
+            os.remove(enc_path)
+        return ok
         
     except Exception as e:
         print(f"Compress/encrypt error: {e}")
+        # Don't leave a truncated encrypted file that looks like a backup
+        if enc_path:
+            try:
+                os.remove(enc_path)
+            except OSError:
+                pass
         return False
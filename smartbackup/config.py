@@ -6,7 +6,9 @@ Handles cross-platform paths and application settings.
 import os
 import sys
 import json
+import atexit
 import locale
+import threading
 from pathlib import Path
 from typing import Optional, Dict, Any
 
@@ -16,12 +18,17 @@ class Config:
     
     APP_NAME = "SmartBackup"
     CONFIG_FILE = "config.json"
+    SAVE_DELAY = 0.5  # seconds; coalesces bursts of set() calls into one write
     
     def __init__(self):
         self._config_dir = self._get_config_dir()
         self._config_file = self._config_dir / self.CONFIG_FILE
         self._settings: Dict[str, Any] = {}
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        self._save_lock = threading.Lock()
         self._load()
+        atexit.register(self._flush)
     
     def _get_config_dir(self) -> Path:
         """Get the appropriate config directory for the current platform."""
@@ -51,6 +58,9 @@ class Config:
             "enable_compression": False,
             "enable_encryption": False,
             "encryption_password": "",
+            "verify_file_contents": False,
+            "deduplicate_files": False,
+            "spot_check_files": False,
         }
     
     def _detect_language(self) -> str:
@@ -78,16 +88,47 @@ class Config:
             self._save()
     
     def _save(self) -> None:
-        """Save current configuration to file."""
+        """Save current configuration to file atomically."""
+        tmp_file = self._config_file.with_suffix(".json.tmp")
+        # json.dump walks the dict in Python; dump a copy (taken in one C call)
+        # so setters writing self._settings directly can't change it mid-dump
+        settings = dict(self._settings)
         try:
-            with open(self._config_file, "w", encoding="utf-8") as f:
-                json.dump(self._settings, f, indent=2, ensure_ascii=False)
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(settings, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, self._config_file)
         except IOError as e:
             print(f"Warning: Could not save config: {e}")
     
+    def _schedule_save(self, changes: Dict[str, Any]) -> None:
+        """Apply changes, mark settings dirty and write them after SAVE_DELAY seconds."""
+        with self._save_lock:
+            # Under the lock so a pending save never sees a half-applied update
+            self._settings.update(changes)
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.SAVE_DELAY, self._flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+    
+    def _flush(self) -> None:
+        """Write the configuration if a scheduled save is still pending."""
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self._dirty:
+                self._dirty = False
+                self._save()
+    
     def save(self) -> None:
-        """Public method to save configuration."""
-        self._save()
+        """Public method to save configuration immediately."""
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            self._dirty = False
+            self._save()
     
     @property
     def config_dir(self) -> Path:
@@ -104,14 +145,12 @@ class Config:
         return self._settings.get(key, default)
     
     def set(self, key: str, value: Any) -> None:
-        """Set a configuration value and save."""
-        self._settings[key] = value
-        self._save()
+        """Set a configuration value and schedule a save."""
+        self._schedule_save({key: value})
     
     def update(self, settings: Dict[str, Any]) -> None:
         """Update multiple settings at once."""
-        self._settings.update(settings)
-        self._save()
+        self._schedule_save(settings)
     
     @property
     def language(self) -> str:
@@ -176,6 +215,30 @@ class Config:
     @encryption_password.setter
     def encryption_password(self, value: str) -> None:
         self._settings["encryption_password"] = value
+    
+    @property
+    def verify_file_contents(self) -> bool:
+        return self.get("verify_file_contents", False)
+    
+    @verify_file_contents.setter
+    def verify_file_contents(self, value: bool) -> None:
+        self._settings["verify_file_contents"] = value
+    
+    @property
+    def spot_check_files(self) -> bool:
+        return self.get("spot_check_files", False)
+    
+    @spot_check_files.setter
+    def spot_check_files(self, value: bool) -> None:
+        self._settings["spot_check_files"] = value
+    
+    @property
+    def deduplicate_files(self) -> bool:
+        return self.get("deduplicate_files", False)
+    
+    @deduplicate_files.setter
+    def deduplicate_files(self, value: bool) -> None:
+        self._settings["deduplicate_files"] = value
 
 
 # Global config instance
@@ -4,14 +4,80 @@ Handles backup history, file hashes, and configuration persistence.
 """
 
 import sqlite3
+import queue
+import threading
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, Callable
 from contextlib import contextmanager
 
 from .config import get_config
 
 
+# Sessions with more files than this are looked up on disk instead of loaded
+SESSION_FILES_IN_MEMORY = 1_000_000
+
+# Memory-map up to this much of the database file for reads (256 MiB)
+DB_MMAP_SIZE = 256 * 1024 * 1024
+
+# Progress update; a NULL parameter leaves that counter unchanged
+_UPDATE_SESSION_PROGRESS_SQL = """
+    UPDATE backup_sessions SET
+        files_total = COALESCE(?, files_total),
+        files_copied = COALESCE(?, files_copied),
+        files_skipped = COALESCE(?, files_skipped),
+        bytes_copied = COALESCE(?, bytes_copied)
+    WHERE id = ?
+"""
+
+
+def _prefix_upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with prefix."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SessionFileIndex:
+    """
+    Read-only dict-like view of a session's file hashes that queries
+    SQLite per lookup, for sessions too large to load into memory.
+    Each thread gets its own connection.
+    """
+    
+    def __init__(self, db_path: Path, session_id: int, count: int):
+        self._db_path = db_path
+        self._session_id = session_id
+        self._count = count
+        self._local = threading.local()
+    
+    def _cursor(self) -> sqlite3.Cursor:
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            conn = sqlite3.connect(self._db_path)
+            conn.execute("PRAGMA query_only=ON")
+            conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+            cursor = self._local.cursor = conn.cursor()
+        return cursor
+    
+    def get(self, relative_path: str, default=None):
+        row = self._cursor().execute("""
+            SELECT file_hash, file_size, modified_at, hash_algo, sample_hash 
+            FROM file_hashes WHERE session_id = ? AND relative_path = ?
+        """, (self._session_id, relative_path)).fetchone()
+        return default if row is None else row
+    
+    def __getitem__(self, relative_path: str) -> Tuple[str, int, Any, str, Optional[str]]:
+        row = self.get(relative_path)
+        if row is None:
+            raise KeyError(relative_path)
+        return row
+    
+    def __contains__(self, relative_path: str) -> bool:
+        return self.get(relative_path) is not None
+    
+    def __len__(self) -> int:
+        return self._count
+
+
 class Database:
     """SQLite database manager for backup operations."""
     
@@ -24,6 +90,10 @@ class Database:
         with self._get_connection() as conn:
             cursor = conn.cursor()
             
+            # Write-ahead log: readers don't block the backup writer, and with
+            # synchronous=NORMAL commits no longer fsync (persistent setting)
+            cursor.execute("PRAGMA journal_mode=WAL")
+            
             # Backup sessions table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS backup_sessions (
@@ -57,19 +127,58 @@ class Database:
                     relative_path TEXT NOT NULL,
                     file_hash TEXT NOT NULL,
                     file_size INTEGER NOT NULL,
-                    modified_at TIMESTAMP NOT NULL,
+                    modified_at INTEGER NOT NULL,
+                    hash_algo TEXT NOT NULL DEFAULT 'sha256',
+                    sample_hash TEXT,
                     FOREIGN KEY (session_id) REFERENCES backup_sessions(id)
                 )
             """)
             
-            # Create indexes for faster lookups
+            # Migration: hashes stored before hash_algo existed are SHA-256
+            cursor.execute("PRAGMA table_info(file_hashes)")
+            columns = [info[1] for info in cursor.fetchall()]
+            if "hash_algo" not in columns:
+                cursor.execute("ALTER TABLE file_hashes ADD COLUMN hash_algo TEXT NOT NULL DEFAULT 'sha256'")
+            if "quick_hash" in columns:
+                cursor.execute("ALTER TABLE file_hashes RENAME COLUMN quick_hash TO sample_hash")
+            elif "sample_hash" not in columns:
+                cursor.execute("ALTER TABLE file_hashes ADD COLUMN sample_hash TEXT")
+            
+            # Hash cache keyed by (device, inode), reused across runs while the
+            # file's path, size and mtime are unchanged
+            cursor.execute("PRAGMA table_info(file_hash_cache)")
+            columns = [info[1] for info in cursor.fetchall()]
+            if columns and "device" not in columns:
+                # Older caches were keyed by inode alone, which collides across
+                # volumes. It's only a cache: start over with the new key.
+                cursor.execute("DROP TABLE file_hash_cache")
+            
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_file_hashes_path 
-                ON file_hashes(relative_path)
+                CREATE TABLE IF NOT EXISTS file_hash_cache (
+                    device INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    path TEXT NOT NULL,
+                    file_size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    file_hash TEXT NOT NULL,
+                    hash_algo TEXT NOT NULL,
+                    PRIMARY KEY (device, inode)
+                )
             """)
+            
+            # Create indexes for faster lookups. (session_id, relative_path)
+            # serves both per-session scans and per-file lookups, so the old
+            # single-column indexes only cost time on every insert.
+            cursor.execute("DROP INDEX IF EXISTS idx_file_hashes_path")
+            cursor.execute("DROP INDEX IF EXISTS idx_file_hashes_session")
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_file_hashes_session 
-                ON file_hashes(session_id)
+                CREATE INDEX IF NOT EXISTS idx_file_hashes_session_path 
+                ON file_hashes(session_id, relative_path)
+            """)
+            # Loading one source's entries and evicting stale paths
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_hash_cache_path 
+                ON file_hash_cache(path)
             """)
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_sessions_source 
@@ -87,6 +196,9 @@ class Database:
         """Context manager for database connections."""
         conn = sqlite3.connect(self._db_path)
         conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
         try:
             yield conn
         finally:
@@ -120,32 +232,61 @@ class Database:
         bytes_copied: int = None
     ) -> None:
         """Update session progress counters."""
-        updates = []
-        values = []
-        
-        if files_total is not None:
-            updates.append("files_total = ?")
-            values.append(files_total)
-        if files_copied is not None:
-            updates.append("files_copied = ?")
-            values.append(files_copied)
-        if files_skipped is not None:
-            updates.append("files_skipped = ?")
-            values.append(files_skipped)
-        if bytes_copied is not None:
-            updates.append("bytes_copied = ?")
-            values.append(bytes_copied)
-        
-        if not updates:
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            self._update_session_progress(
+                cursor, session_id, files_total, files_copied, files_skipped, bytes_copied
+            )
+            conn.commit()
+    
+    def _update_session_progress(
+        self,
+        cursor: sqlite3.Cursor,
+        session_id: int,
+        files_total: Optional[int],
+        files_copied: Optional[int],
+        files_skipped: Optional[int],
+        bytes_copied: Optional[int]
+    ) -> None:
+        """Run the progress UPDATE on an open cursor (no commit)."""
+        if (files_total is None and files_copied is None
+                and files_skipped is None and bytes_copied is None):
             return
         
-        values.append(session_id)
+        # One fixed statement (None keeps the column) so sqlite3 reuses the prepared query
+        cursor.execute(
+            _UPDATE_SESSION_PROGRESS_SQL,
+            (files_total, files_copied, files_skipped, bytes_copied, session_id)
+        )
+    
+    def store_backup_progress(
+        self,
+        session_id: int,
+        files: List[Tuple[str, str, int, int, str, Optional[str]]],
+        cache_entries: List[Tuple[int, int, str, int, int, str]],
+        hash_algo: str,
+        files_total: int,
+        files_copied: int,
+        files_skipped: int,
+        bytes_copied: int
+    ) -> None:
+        """
+        Store a backup's pending file hashes, hash cache entries and progress
+        counters in a single transaction.
         
+        Args:
+            session_id: The backup session ID
+            files: Rows for store_file_hashes_batch()
+            cache_entries: Entries for store_hash_cache_batch(), hashed with hash_algo
+        """
         with self._get_connection() as conn:
+            # Room for a whole 10k-row batch and its index pages (64 MiB)
+            conn.execute("PRAGMA cache_size=-65536")
             cursor = conn.cursor()
-            cursor.execute(
-                f"UPDATE backup_sessions SET {', '.join(updates)} WHERE id = ?",
-                values
+            self._insert_file_hashes(cursor, session_id, files)
+            self._replace_hash_cache(cursor, cache_entries, hash_algo)
+            self._update_session_progress(
+                cursor, session_id, files_total, files_copied, files_skipped, bytes_copied
             )
             conn.commit()
     
@@ -259,39 +400,51 @@ class Database:
         relative_path: str, 
         file_hash: str,
         file_size: int,
-        modified_at: datetime
+        modified_at: int,
+        hash_algo: str,
+        sample_hash: Optional[str] = None
     ) -> None:
-        """Store a file hash for a backup session."""
+        """Store a file hash for a backup session (modified_at is st_mtime_ns)."""
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT INTO file_hashes 
-                (session_id, relative_path, file_hash, file_size, modified_at)
-                VALUES (?, ?, ?, ?, ?)
-            """, (session_id, relative_path, file_hash, file_size, modified_at))
+                (session_id, relative_path, file_hash, file_size, modified_at, hash_algo, sample_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (session_id, relative_path, file_hash, file_size, modified_at, hash_algo, sample_hash))
             conn.commit()
     
     def store_file_hashes_batch(
         self, 
         session_id: int, 
-        files: List[Tuple[str, str, int, datetime]]
+        files: List[Tuple[str, str, int, int, str, Optional[str]]]
     ) -> None:
         """
         Store multiple file hashes efficiently.
         
         Args:
             session_id: The backup session ID
-            files: List of (relative_path, file_hash, file_size, modified_at) tuples
+            files: List of (relative_path, file_hash, file_size, modified_at, hash_algo,
+                sample_hash) tuples, with modified_at as st_mtime_ns
         """
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.executemany("""
-                INSERT INTO file_hashes 
-                (session_id, relative_path, file_hash, file_size, modified_at)
-                VALUES (?, ?, ?, ?, ?)
-            """, [(session_id, *f) for f in files])
+            self._insert_file_hashes(cursor, session_id, files)
             conn.commit()
     
+    def _insert_file_hashes(
+        self,
+        cursor: sqlite3.Cursor,
+        session_id: int,
+        files: List[Tuple[str, str, int, int, str, Optional[str]]]
+    ) -> None:
+        """Insert file hash rows on an open cursor (no commit)."""
+        cursor.executemany("""
+            INSERT INTO file_hashes 
+            (session_id, relative_path, file_hash, file_size, modified_at, hash_algo, sample_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(session_id, *f) for f in files])
+    
     def get_file_hash(
         self, 
         session_id: int, 
@@ -310,28 +463,172 @@ class Database:
     def get_session_files(
         self, 
         session_id: int
-    ) -> Dict[str, Tuple[str, int, datetime]]:
+    ) -> Dict[str, Tuple[str, int, Any, str, Optional[str]]]:
         """
         Get all file hashes from a session.
         
         Returns:
-            Dict mapping relative_path to (hash, size, modified_at)
+            Dict mapping relative_path to (hash, size, modified_at, hash_algo, sample_hash).
+            modified_at is st_mtime_ns, or an ISO timestamp string for
+            sessions written by older versions.
         """
         with self._get_connection() as conn:
+            # Plain tuples streamed from the cursor: this can be millions of rows,
+            # so skip sqlite3.Row objects and the intermediate fetchall() list
             cursor = conn.cursor()
+            cursor.row_factory = None
             cursor.execute("""
-                SELECT relative_path, file_hash, file_size, modified_at 
+                SELECT relative_path, file_hash, file_size, modified_at, hash_algo, sample_hash 
                 FROM file_hashes WHERE session_id = ?
             """, (session_id,))
             
+            # Share one string per algorithm name instead of one per row
+            algorithms: Dict[str, str] = {}
+            
             return {
-                row["relative_path"]: (
-                    row["file_hash"], 
-                    row["file_size"], 
-                    row["modified_at"]
+                relative_path: (
+                    file_hash, 
+                    file_size, 
+                    modified_at,
+                    algorithms.setdefault(hash_algo, hash_algo),
+                    sample_hash
                 )
-                for row in cursor.fetchall()
+                for relative_path, file_hash, file_size, modified_at, hash_algo, sample_hash in cursor
             }
+    
+    def get_session_files_lookup(self, session_id: int):
+        """
+        Get a session's files for per-path lookups.
+        
+        Returns:
+            The get_session_files() dict, or a SessionFileIndex with the
+            same get()/[]/in/len() interface for sessions with more than
+            SESSION_FILES_IN_MEMORY files
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM file_hashes WHERE session_id = ?", (session_id,))
+            count = cursor.fetchone()[0]
+        
+        if count > SESSION_FILES_IN_MEMORY:
+            return SessionFileIndex(self._db_path, session_id, count)
+        return self.get_session_files(session_id)
+
+    
+    # ==================== Hash Cache ====================
+    
+    def get_hash_cache(
+        self, 
+        hash_algo: str, 
+        path_prefix: str
+    ) -> Dict[str, Tuple[int, int, int, str]]:
+        """
+        Get cached file hashes computed with the given algorithm for files
+        under path_prefix (a directory path ending with a separator).
+        
+        Returns:
+            Dict mapping path to (inode, size, mtime_ns, hash)
+        """
+        with self._get_connection() as conn:
+            # Plain tuples streamed from the cursor, as in get_session_files
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute("""
+                SELECT inode, path, file_size, mtime_ns, file_hash 
+                FROM file_hash_cache 
+                WHERE path >= ? AND path < ? AND hash_algo = ?
+            """, (path_prefix, _prefix_upper_bound(path_prefix), hash_algo))
+            
+            return {
+                path: (inode, file_size, mtime_ns, file_hash)
+                for inode, path, file_size, mtime_ns, file_hash in cursor
+            }
+    
+    def store_hash_cache_batch(
+        self, 
+        entries: List[Tuple[int, int, str, int, int, str]],
+        hash_algo: str
+    ) -> None:
+        """
+        Insert or refresh cached file hashes.
+        
+        Args:
+            entries: List of (device, inode, path, size, mtime_ns, hash) tuples
+            hash_algo: Algorithm the hashes were computed with
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            self._replace_hash_cache(cursor, entries, hash_algo)
+            conn.commit()
+    
+    def _replace_hash_cache(
+        self,
+        cursor: sqlite3.Cursor,
+        entries: List[Tuple[int, int, str, int, int, str]],
+        hash_algo: str
+    ) -> None:
+        """Insert or refresh hash cache entries on an open cursor (no commit)."""
+        cursor.executemany("""
+            INSERT OR REPLACE INTO file_hash_cache 
+            (device, inode, path, file_size, mtime_ns, file_hash, hash_algo)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(*e, hash_algo) for e in entries])
+    
+    def evict_hash_cache(self, paths: List[str]) -> None:
+        """Delete hash cache entries for files that no longer exist."""
+        with self._get_connection() as conn:
+            conn.executemany(
+                "DELETE FROM file_hash_cache WHERE path = ?",
+                [(path,) for path in paths]
+            )
+            conn.commit()
+
+
+class DatabaseWriter:
+    """
+    Runs database writes on a background thread so the caller only waits
+    on SQLite when max_pending writes are already queued. Writes run in
+    the order they were queued.
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, max_pending: int = 8):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._error: Optional[Exception] = None
+        self._thread = threading.Thread(target=self._run, name="DatabaseWriter", daemon=True)
+        self._thread.start()
+    
+    def put(self, write: Callable[..., Any], *args, **kwargs) -> None:
+        """Queue a write, blocking while the queue is full; arguments must not be mutated afterwards."""
+        self._queue.put((write, args, kwargs))
+    
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            if self._error is not None:
+                continue  # A write failed, drop the rest
+            
+            write, args, kwargs = item
+            try:
+                write(*args, **kwargs)
+            except Exception as e:
+                self._error = e
+    
+    def close(self) -> None:
+        """
+        Wait for all queued writes to finish.
+        
+        Raises:
+            The first exception raised by a queued write, if any
+        """
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
 
 
 # Global database instance
@@ -1,51 +1,164 @@
 """
-SHA-256 file hashing utilities for SmartBackup.
+File hashing utilities for SmartBackup.
 Used for detecting file changes and deduplication.
 """
 
+import os
+import shutil
 import hashlib
 from pathlib import Path
 from typing import Optional, Callable
 
+# BLAKE3 is much faster than SHA-256; fall back to stdlib BLAKE2b without it
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
 
-# Buffer size for reading large files (64KB)
-BUFFER_SIZE = 65536
 
+# Buffer size for reading files (1MB)
+BUFFER_SIZE = 1024 * 1024
 
-def compute_file_hash(file_path: Path, progress_callback: Optional[Callable[[int, int], None]] = None) -> Optional[str]:
+# Buffer size when a large file is hashed on all cores, so each update()
+# gives BLAKE3 enough input to split across threads (8MB)
+PARALLEL_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Bytes read from each end of a file for a sample hash (64KB)
+SAMPLE_SIZE = 65536
+
+# Files at least this big are hashed on all cores when BLAKE3 is available (16MB)
+PARALLEL_HASH_THRESHOLD = 16 * 1024 * 1024
+
+# Algorithm used for new content hashes (stored alongside each hash)
+HASH_ALGORITHM = "blake3" if BLAKE3_AVAILABLE else "blake2b"
+
+
+def _new_hasher(algorithm: str, multithreaded: bool = False):
     """
-    Compute SHA-256 hash of a file.
+    Create a hash object for the given algorithm name.
+    
+    multithreaded lets BLAKE3 split a single large input across all cores
+    (same digest); other algorithms ignore it.
+    """
+    if algorithm == "blake3":
+        if multithreaded:
+            return blake3.blake3(max_threads=blake3.blake3.AUTO)
+        return blake3.blake3()
+    if algorithm == "blake2b":
+        return hashlib.blake2b(digest_size=32)
+    # Change detection, not security: also keeps working on FIPS-mode OpenSSL
+    return hashlib.new(algorithm, usedforsecurity=False)
+
+
+def compute_file_hash(
+    file_path: Path, 
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    algorithm: str = HASH_ALGORITHM
+) -> Optional[str]:
+    """
+    Compute the content hash of a file.
     
     Args:
         file_path: Path to the file to hash
         progress_callback: Optional callback(bytes_read, total_bytes) for progress reporting
+        algorithm: Hash algorithm name (defaults to HASH_ALGORITHM)
     
     Returns:
         Hexadecimal hash string, or None if file cannot be read
     """
     try:
-        file_size = file_path.stat().st_size
         bytes_read = 0
         
-        sha256_hash = hashlib.sha256()
-        
-        with open(file_path, "rb") as f:
+        # Unbuffered: reads go straight into our own buffer. Files are read
+        # rather than memory-mapped: a mapped file truncated by another
+        # process (live logs, databases) would kill us with SIGBUS.
+        with open(file_path, "rb", buffering=0) as f:
+            # fstat the open descriptor instead of resolving the path again
+            file_size = os.fstat(f.fileno()).st_size
+            
+            multithreaded = file_size >= PARALLEL_HASH_THRESHOLD
+            file_hash = _new_hasher(algorithm, multithreaded=multithreaded)
+            buffer_size = PARALLEL_BUFFER_SIZE if multithreaded else BUFFER_SIZE
+            
+            # Larger read-ahead; the cache is kept, a copy of this file may follow
+            if hasattr(os, "posix_fadvise"):
+                try:
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                except OSError:
+                    pass  # Only a hint
+            
+            # Reuse one buffer; sized so a small file is read in one call
+            buffer = memoryview(bytearray(min(buffer_size, file_size + 1)))
             while True:
-                data = f.read(BUFFER_SIZE)
-                if not data:
+                size = f.readinto(buffer)
+                if not size:
                     break
-                sha256_hash.update(data)
-                bytes_read += len(data)
+                file_hash.update(buffer[:size])
+                bytes_read += size
                 
                 if progress_callback:
                     progress_callback(bytes_read, file_size)
         
-        return sha256_hash.hexdigest()
+        return file_hash.hexdigest()
     
     except (IOError, OSError, PermissionError):
         return None
 
 
+def copy_and_hash(
+    source: str, 
+    dest: str, 
+    algorithm: str = HASH_ALGORITHM
+) -> str:
+    """
+    Copy a file and its metadata (like shutil.copy2) while hashing it,
+    so the source is read only once.
+    
+    Args:
+        source: Path to the file to copy
+        dest: Destination file path
+        algorithm: Hash algorithm name (defaults to HASH_ALGORITHM)
+    
+    Returns:
+        Hexadecimal hash string of the copied data
+    
+    Raises:
+        OSError: If the file cannot be read or written
+    """
+    with open(source, "rb", buffering=0) as fsrc, open(dest, "wb") as fdst:
+        src_fd = fsrc.fileno()
+        file_size = os.fstat(src_fd).st_size
+        multithreaded = file_size >= PARALLEL_HASH_THRESHOLD
+        file_hash = _new_hasher(algorithm, multithreaded=multithreaded)
+        buffer_size = PARALLEL_BUFFER_SIZE if multithreaded else BUFFER_SIZE
+        
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.posix_fadvise(src_fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except OSError:
+                pass  # Only a hint
+        
+        buffer = memoryview(bytearray(min(buffer_size, file_size + 1)))
+        while True:
+            size = fsrc.readinto(buffer)
+            if not size:
+                break
+            chunk = buffer[:size]
+            file_hash.update(chunk)
+            fdst.write(chunk)
+        
+        # Read once per backup: don't let it push useful pages out of the cache
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.posix_fadvise(src_fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError:
+                pass
+    
+    shutil.copystat(source, dest)
+    return file_hash.hexdigest()
+
+
 def compute_quick_hash(file_path: Path) -> Optional[str]:
     """
     Compute a quick hash using file metadata for fast comparison.
@@ -63,14 +176,46 @@ def compute_quick_hash(file_path: Path) -> Optional[str]:
         stat = file_path.stat()
         # Combine size and mtime for quick comparison
         quick_data = f"{stat.st_size}:{stat.st_mtime_ns}".encode()
-        return hashlib.md5(quick_data).hexdigest()
+        return hashlib.md5(quick_data, usedforsecurity=False).hexdigest()
+    except (IOError, OSError, PermissionError):
+        return None
+
+
+def compute_sample_hash(file_path: Path) -> Optional[str]:
+    """
+    Compute a cheap hash of a file's size, first 64KB and last 64KB.
+    
+    Catches most content changes that kept size and mtime intact without
+    reading the whole file. Always BLAKE2b, so stored samples stay
+    comparable on machines without BLAKE3.
+    
+    Args:
+        file_path: Path to the file
+    
+    Returns:
+        Sample hash string, or None if file cannot be read
+    """
+    try:
+        sample_hash = hashlib.blake2b(digest_size=16)
+        
+        with open(file_path, "rb") as f:
+            file_size = os.fstat(f.fileno()).st_size
+            sample_hash.update(str(file_size).encode())
+            sample_hash.update(f.read(SAMPLE_SIZE))
+            
+            if file_size > SAMPLE_SIZE:
+                f.seek(max(SAMPLE_SIZE, file_size - SAMPLE_SIZE))
+                sample_hash.update(f.read(SAMPLE_SIZE))
+        
+        return sample_hash.hexdigest()
+    
     except (IOError, OSError, PermissionError):
         return None
 
 
 def files_are_identical(file1: Path, file2: Path) -> bool:
     """
-    Check if two files are identical by comparing their SHA-256 hashes.
+    Check if two files are identical by comparing their content hashes.
     
     Args:
         file1: First file path
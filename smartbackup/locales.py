@@ -3,7 +3,7 @@ Localization strings for SmartBackup.
 Supports English and Spanish.
 """
 
-from typing import Dict
+from typing import Dict, Tuple
 
 STRINGS: Dict[str, Dict[str, str]] = {
     # Application
@@ -469,6 +469,46 @@ STRINGS: Dict[str, Dict[str, str]] = {
         "en": "Reduce backup size by compressing files",
         "es": "Reducir tamaño del backup comprimiendo archivos"
     },
+    "deduplication_settings": {
+        "en": "Deduplication",
+        "es": "Deduplicación"
+    },
+    "enable_deduplication": {
+        "en": "Store identical files only once (hard links)",
+        "es": "Guardar archivos idénticos una sola vez (enlaces duros)"
+    },
+    "deduplication_desc": {
+        "en": "Saves space on NTFS/ext4/APFS drives. Not supported on FAT/exFAT",
+        "es": "Ahorra espacio en unidades NTFS/ext4/APFS. No disponible en FAT/exFAT"
+    },
+    "deduplication_shared_warning": {
+        "en": "Identical files are shared between backups: editing one inside a backup folder changes it in every backup",
+        "es": "Los archivos idénticos se comparten entre backups: editar uno dentro de una carpeta de backup lo cambia en todos"
+    },
+    "free_unused_space": {
+        "en": "Free unused space",
+        "es": "Liberar espacio sin usar"
+    },
+    "unused_objects_removed": {
+        "en": "{count} deduplicated files no longer used by any backup were removed",
+        "es": "Se eliminaron {count} archivos deduplicados que ya no usaba ningún backup"
+    },
+    "verification_settings": {
+        "en": "Change Detection",
+        "es": "Detección de Cambios"
+    },
+    "verify_file_contents": {
+        "en": "Always compare file contents",
+        "es": "Comparar siempre el contenido de los archivos"
+    },
+    "spot_check_files": {
+        "en": "Spot-check unchanged files (start and end of each file)",
+        "es": "Comprobar archivos sin cambios (inicio y final de cada archivo)"
+    },
+    "verify_file_contents_desc": {
+        "en": "Slower. Use if programs modify files without updating their date",
+        "es": "Más lento. Úsalo si algún programa modifica archivos sin cambiar su fecha"
+    },
     "encryption_settings": {
         "en": "Encryption",
         "es": "Cifrado"
@@ -552,6 +592,14 @@ STRINGS: Dict[str, Dict[str, str]] = {
 }
 
 
+# Flat (key, lang) -> text view of STRINGS, so a lookup is a single dict probe
+_FLAT_STRINGS: Dict[Tuple[str, str], str] = {
+    (key, lang): text
+    for key, translations in STRINGS.items()
+    for lang, text in translations.items()
+}
+
+
 def get_string(key: str, lang: str = "en", **kwargs) -> str:
     """
     Get a localized string.
@@ -564,11 +612,11 @@ def get_string(key: str, lang: str = "en", **kwargs) -> str:
     Returns:
         The localized string, formatted with any provided arguments
     """
-    if key not in STRINGS:
-        return key
-    
-    string_dict = STRINGS[key]
-    text = string_dict.get(lang, string_dict.get("en", key))
+    text = _FLAT_STRINGS.get((key, lang))
+    if text is None:
+        text = _FLAT_STRINGS.get((key, "en"))
+        if text is None:
+            return key
     
     if kwargs:
         try:
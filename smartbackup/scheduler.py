@@ -12,7 +12,7 @@ from enum import Enum
 import json
 
 from .config import get_config
-from .backup_engine import get_backup_engine, BackupMode, BackupProgress, BackupResult
+from .backup_engine import get_backup_engine, BackupMode, BackupProgress, BackupResult, OBJECT_STORE_DIR
 
 
 class ScheduleFrequency(Enum):
@@ -404,25 +404,21 @@ class BackupScheduler:
         # Apply compression and/or encryption if backup was successful
         if result.success and result.backup_folder and (schedule.compress or schedule.encrypt):
             try:
-                from .backup_utils import compress_folder, encrypt_file
+                from .backup_utils import compress_and_encrypt_backup, prune_object_store
                 import shutil
                 import os
                 
                 backup_path = result.backup_folder
                 
-                if schedule.compress or schedule.encrypt:
-                    # Always create a zip for compression or encryption
-                    zip_path = backup_path + ".zip"
-                    compress_folder(backup_path, zip_path)
-                    
-                    if schedule.encrypt and schedule.encryption_password:
-                        # Encrypt the zip file
-                        enc_path = backup_path + ".zip.enc"
-                        encrypt_file(zip_path, enc_path, schedule.encryption_password)
-                        os.remove(zip_path)  # Remove unencrypted zip
-                    
+                # Always create a zip for compression or encryption, encrypted
+                # while it is written (backup_path + ".zip" or ".zip.enc")
+                password = schedule.encryption_password if schedule.encrypt else None
+                if compress_and_encrypt_backup(backup_path, backup_path, password or None, compress=True):
                     # Remove original backup folder since we have compressed/encrypted version
                     shutil.rmtree(backup_path)
+                    
+                    # Drop deduplicated objects only that folder was using
+                    prune_object_store(os.path.join(os.path.dirname(backup_path), OBJECT_STORE_DIR))
             except Exception as e:
                 print(f"Post-processing error: {e}")
         
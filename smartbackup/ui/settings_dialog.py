@@ -3,6 +3,7 @@ Settings dialog for SmartBackup.
 Allows users to configure startup, compression, and encryption options.
 """
 
+import os
 import customtkinter as ctk
 from tkinter import messagebox
 from typing import TYPE_CHECKING, Optional
@@ -13,7 +14,8 @@ if TYPE_CHECKING:
 from ..locales import Localizer
 from ..config import get_config
 from ..startup import is_startup_available, is_startup_enabled, toggle_startup
-from ..backup_utils import is_crypto_available
+from ..backup_utils import is_crypto_available, prune_object_store
+from ..backup_engine import OBJECT_STORE_DIR
 from .theme import get_colors
 
 
@@ -133,6 +135,86 @@ class SettingsDialog(ctk.CTkToplevel):
         )
         compress_desc.pack(fill="x", padx=15, pady=(0, 12))
         
+        # === DEDUPLICATION SECTION ===
+        dedup_card = self._create_card(container, "🔗 " + self._("deduplication_settings"))
+        
+        self._dedup_var = ctk.BooleanVar(value=self._config.deduplicate_files)
+        dedup_check = ctk.CTkCheckBox(
+            dedup_card,
+            text=self._("enable_deduplication"),
+            variable=self._dedup_var,
+            font=ctk.CTkFont(size=13),
+            checkbox_width=24,
+            checkbox_height=24
+        )
+        dedup_check.pack(fill="x", padx=15, pady=(0, 5))
+        
+        dedup_desc = ctk.CTkLabel(
+            dedup_card,
+            text=self._("deduplication_desc"),
+            font=ctk.CTkFont(size=11),
+            text_color="gray",
+            anchor="w"
+        )
+        dedup_desc.pack(fill="x", padx=15, pady=(0, 4))
+        
+        dedup_warning = ctk.CTkLabel(
+            dedup_card,
+            text=self._("deduplication_shared_warning"),
+            font=ctk.CTkFont(size=11),
+            text_color="gray",
+            anchor="w",
+            justify="left",
+            wraplength=420
+        )
+        dedup_warning.pack(fill="x", padx=15, pady=(0, 8))
+        
+        prune_btn = ctk.CTkButton(
+            dedup_card,
+            text="🧹 " + self._("free_unused_space"),
+            command=self._prune_objects,
+            height=32,
+            corner_radius=8,
+            fg_color=self._colors["surface"],
+            hover_color=self._colors["secondary_hover"],
+            font=ctk.CTkFont(size=12)
+        )
+        prune_btn.pack(anchor="w", padx=15, pady=(0, 12))
+        
+        # === CHANGE DETECTION SECTION ===
+        verify_card = self._create_card(container, "🔍 " + self._("verification_settings"))
+        
+        self._verify_var = ctk.BooleanVar(value=self._config.verify_file_contents)
+        verify_check = ctk.CTkCheckBox(
+            verify_card,
+            text=self._("verify_file_contents"),
+            variable=self._verify_var,
+            font=ctk.CTkFont(size=13),
+            checkbox_width=24,
+            checkbox_height=24
+        )
+        verify_check.pack(fill="x", padx=15, pady=(0, 5))
+        
+        self._spot_check_var = ctk.BooleanVar(value=self._config.spot_check_files)
+        spot_check = ctk.CTkCheckBox(
+            verify_card,
+            text=self._("spot_check_files"),
+            variable=self._spot_check_var,
+            font=ctk.CTkFont(size=13),
+            checkbox_width=24,
+            checkbox_height=24
+        )
+        spot_check.pack(fill="x", padx=15, pady=(0, 5))
+        
+        verify_desc = ctk.CTkLabel(
+            verify_card,
+            text=self._("verify_file_contents_desc"),
+            font=ctk.CTkFont(size=11),
+            text_color="gray",
+            anchor="w"
+        )
+        verify_desc.pack(fill="x", padx=15, pady=(0, 12))
+        
         # === ENCRYPTION SECTION ===
         encrypt_card = self._create_card(container, "🔐 " + self._("encryption_settings"))
         
@@ -279,6 +361,9 @@ class SettingsDialog(ctk.CTkToplevel):
         
         # Save config
         self._config.enable_compression = self._compress_var.get()
+        self._config.verify_file_contents = self._verify_var.get()
+        self._config.spot_check_files = self._spot_check_var.get()
+        self._config.deduplicate_files = self._dedup_var.get()
         self._config.enable_encryption = self._encrypt_var.get()
         
         if self._encrypt_var.get():
@@ -295,6 +380,17 @@ class SettingsDialog(ctk.CTkToplevel):
         
         self._on_close()
     
+    def _prune_objects(self):
+        """Free deduplicated files no backup in the last destination uses anymore."""
+        destination = self._config.last_destination
+        object_store = os.path.join(destination, OBJECT_STORE_DIR) if destination else ""
+        removed = prune_object_store(object_store) if os.path.isdir(object_store) else 0
+        
+        messagebox.showinfo(
+            self._("app_title"),
+            self._("unused_objects_removed", count=removed)
+        )
+    
     def _on_close(self):
         """Handle dialog close."""
         self.grab_release()